@@ -62,6 +62,21 @@ class Alert(models.Model):
     def __str__(self):
         return f"{self.title} - {self.severity} ({self.status})"
 
+    # Status changes go through the lifecycle service so response-time
+    # statistics stay in step with the table
+    
+    def acknowledge(self):
+        from apps.alerts.services import alert_lifecycle
+        return alert_lifecycle.acknowledge(self)
+    
+    def resolve(self, notes=''):
+        from apps.alerts.services import alert_lifecycle
+        return alert_lifecycle.resolve(self, notes)
+    
+    def mark_false_positive(self, notes=''):
+        from apps.alerts.services import alert_lifecycle
+        return alert_lifecycle.mark_false_positive(self, notes)
+
 
 class AlertRule(models.Model):
     """Configurable alert rules"""
@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from apps.alerts.models import Alert
+
+
+class AlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Alert
+        fields = '__all__'
+        # Status and lifecycle timestamps change only through the transition actions
+        read_only_fields = ['status', 'acknowledged_at', 'resolved_at', 'response_time',
+                            'resolution_notes', 'created_at']
@@ -0,0 +1,204 @@
+"""
+Alert lifecycle service
+Handles alert state transitions and keeps per-site, per-severity response
+statistics up to date as transitions happen
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.alerts.models import Alert
+from apps.alerts.stats import StreamingStats
+
+
+class InvalidTransition(ValueError):
+    """Raised when an alert cannot move to the requested status"""
+
+
+class AlertLifecycleService:
+    """State machine for alerts with streaming response-time analytics
+
+    Sketches live in the shared cache (Redis), so every API worker records
+    into and reads from the same statistics. Each sketch is stored next to
+    a precomputed summary; reads fetch only the summary.
+    """
+    TRANSITIONS = {
+        'active': {'acknowledged', 'resolved', 'false_positive'},
+        'acknowledged': {'resolved', 'false_positive'},
+        'resolved': set(),
+        'false_positive': set(),
+    }
+
+    # Metrics tracked per (site_id, severity)
+    RESPONSE = 'response_time'      # created -> acknowledged
+    RESOLUTION = 'resolution_time'  # created -> resolved
+
+    def __init__(self, compression=100, cache_backend=None):
+        self.compression = compression
+        self.cache = cache_backend or cache
+        self._local_lock = threading.Lock()
+
+    # Statistics
+
+    @staticmethod
+    def _key(metric, site_id, severity):
+        return f'alert-stats:{metric}:{site_id}:{severity}'
+
+    @contextmanager
+    def _locked(self, key):
+        """Cross-process lock when the cache supports it (django-redis)"""
+        if hasattr(self.cache, 'lock'):
+            with self.cache.lock(f'{key}:lock', timeout=10):
+                yield
+        else:
+            with self._local_lock:
+                yield
+
+    def _record_many(self, samples):
+        """Add samples given as {(metric, site_id, severity): [seconds, ...]}"""
+        for (metric, site_id, severity), values in samples.items():
+            key = self._key(metric, site_id, severity)
+            with self._locked(key):
+                stats = self.cache.get(key) or StreamingStats(self.compression)
+                for value in values:
+                    stats.add(value)
+                self.cache.set_many({key: stats, f'{key}:summary': stats.as_dict()}, timeout=None)
+
+    def _record(self, metric, site_id, severity, seconds):
+        self._record_many({(metric, site_id, severity): [seconds]})
+
+    def get_stats(self, site_id, severity, metric=RESPONSE):
+        """Summary for one site/severity pair: a single cache read, no DB query"""
+        summary = self.cache.get(f'{self._key(metric, site_id, severity)}:summary')
+        return summary or StreamingStats().as_dict()
+
+    def percentile(self, site_id, severity, q, metric=RESPONSE):
+        """Single percentile (seconds) for one site/severity pair"""
+        return self.get_stats(site_id, severity, metric).get(f'p{int(q * 100)}')
+
+    def site_summary(self, site_id, metric=RESPONSE):
+        """Stats for every severity level at a site"""
+        keys = {
+            severity: f'{self._key(metric, site_id, severity)}:summary'
+            for severity, _ in Alert.SEVERITY_LEVELS
+        }
+        found = self.cache.get_many(list(keys.values()))
+        return {
+            severity: found.get(key) or StreamingStats().as_dict()
+            for severity, key in keys.items()
+        }
+
+    def rebuild_from_db(self, since=None):
+        """Rebuild every sketch from historical alerts (e.g. after a cache flush)"""
+        alerts = Alert.objects.exclude(acknowledged_at__isnull=True, resolved_at__isnull=True)
+        if since is not None:
+            alerts = alerts.filter(created_at__gte=since)
+        rows = alerts.values_list('site_id', 'severity', 'created_at', 'acknowledged_at', 'resolved_at')
+
+        stats = {}
+        for site_id, severity, created_at, acknowledged_at, resolved_at in rows.iterator():
+            for metric, at in ((self.RESPONSE, acknowledged_at), (self.RESOLUTION, resolved_at)):
+                if at:
+                    key = self._key(metric, site_id, severity)
+                    if key not in stats:
+                        stats[key] = StreamingStats(self.compression)
+                    stats[key].add((at - created_at).total_seconds())
+
+        entries = {}
+        for key, value in stats.items():
+            entries[key] = value
+            entries[f'{key}:summary'] = value.as_dict()
+        self.cache.set_many(entries, timeout=None)
+        return len(stats)
+
+    # Transitions
+
+    def _check(self, alert, status):
+        if status not in self.TRANSITIONS.get(alert.status, set()):
+            raise InvalidTransition(f"Cannot move alert {alert.pk} from {alert.status} to {status}")
+
+    def _apply(self, alert, status, **fields):
+        """Write a transition only if the stored status is still the one checked
+
+        Concurrent or stale transitions update no row and raise
+        InvalidTransition, so each alert changes state (and records its
+        samples) exactly once.
+        """
+        updated = Alert.objects.filter(pk=alert.pk, status=alert.status).update(status=status, **fields)
+        if not updated:
+            raise InvalidTransition(
+                f"Alert {alert.pk} is no longer {alert.status}; reload it before moving it to {status}"
+            )
+        alert.status = status
+        for name, value in fields.items():
+            setattr(alert, name, value)
+
+    def acknowledge(self, alert, at=None):
+        """Mark an active alert acknowledged and record its response time"""
+        self._check(alert, 'acknowledged')
+        now = at or timezone.now()
+        self._apply(alert, 'acknowledged', acknowledged_at=now, response_time=now - alert.created_at)
+        transaction.on_commit(lambda: self._record(
+            self.RESPONSE, alert.site_id, alert.severity, alert.response_time.total_seconds()
+        ))
+        return alert
+
+    def resolve(self, alert, notes='', at=None):
+        """Resolve an alert; unacknowledged alerts count as responded to on resolve"""
+        return self._close(alert, 'resolved', notes, at)
+
+    def mark_false_positive(self, alert, notes='', at=None):
+        """Close an alert as a false positive"""
+        return self._close(alert, 'false_positive', notes, at)
+
+    def _close(self, alert, status, notes, at):
+        self._check(alert, status)
+        now = at or timezone.now()
+        fields = {'resolved_at': now, 'resolution_notes': notes}
+        samples = {}
+        if alert.acknowledged_at is None:
+            fields['acknowledged_at'] = now
+            fields['response_time'] = now - alert.created_at
+            samples[(self.RESPONSE, alert.site_id, alert.severity)] = [
+                fields['response_time'].total_seconds()
+            ]
+        self._apply(alert, status, **fields)
+        if status == 'resolved':
+            samples[(self.RESOLUTION, alert.site_id, alert.severity)] = [
+                (now - alert.created_at).total_seconds()
+            ]
+        transaction.on_commit(lambda: self._record_many(samples))
+        return alert
+
+    def bulk_acknowledge(self, alert_ids, at=None):
+        """Acknowledge many active alerts with a single UPDATE ... RETURNING statement"""
+        alert_ids = list(alert_ids)
+        if not alert_ids:
+            return 0
+        now = at or timezone.now()
+        table = connection.ops.quote_name(Alert._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} "
+                f"SET status = 'acknowledged', acknowledged_at = %s, response_time = %s - created_at "
+                f"WHERE id = ANY(%s) AND status = 'active' "
+                f"RETURNING site_id, severity, created_at",
+                [now, now, alert_ids],
+            )
+            rows = cursor.fetchall()
+
+        samples = {}
+        for site_id, severity, created_at in rows:
+            samples.setdefault((self.RESPONSE, site_id, severity), []).append(
+                (now - created_at).total_seconds()
+            )
+        transaction.on_commit(lambda: self._record_many(samples))
+        return len(rows)
+
+
+# Process-wide service instance; state is shared through the cache
+alert_lifecycle = AlertLifecycleService()
@@ -0,0 +1,148 @@
+"""
+Streaming statistics for alert response analytics
+Running count/mean and t-digest quantile sketches that are updated as
+alerts change state, so dashboard percentiles never scan the alerts table
+"""
+
+import math
+from bisect import bisect_left
+
+
+class TDigest:
+    """Merging t-digest quantile sketch (Dunning & Ertl)"""
+
+    def __init__(self, compression=100, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or compression * 5
+        self.means = []
+        self.weights = []
+        self.total_weight = 0.0
+        self._buffer = []
+        self._cumulative = None
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self):
+        return int(self.total_weight + len(self._buffer))
+
+    def add(self, value, weight=1.0):
+        """Add a sample; merging is deferred until the buffer fills"""
+        self._buffer.append((value, weight))
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self._cumulative = None
+        if len(self._buffer) >= self.buffer_size:
+            self._merge()
+
+    def _merge(self):
+        """Fold buffered samples into the centroid list"""
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in points)
+
+        means, weights = [], []
+        cum = 0.0
+        cur_mean, cur_weight = points[0]
+        limit = self._weight_limit(0.0, total)
+        for mean, weight in points[1:]:
+            if cur_weight + weight <= limit:
+                cur_mean += (mean - cur_mean) * weight / (cur_weight + weight)
+                cur_weight += weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                cum += cur_weight
+                limit = self._weight_limit(cum / total, total)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+
+        self.means, self.weights = means, weights
+        self.total_weight = total
+
+    def _weight_limit(self, q, total):
+        """Maximum centroid weight at quantile q (k1-style scale bound)"""
+        return max(1.0, 4 * total * q * (1 - q) / self.compression)
+
+    def _prepare(self):
+        """Merge pending samples and cache centroid midpoints for lookup"""
+        if self._cumulative is not None:
+            return
+        self._merge()
+        cumulative = []
+        running = 0.0
+        for weight in self.weights:
+            cumulative.append(running + weight / 2)
+            running += weight
+        self._cumulative = cumulative
+
+    def quantile(self, q):
+        """Estimate the q-th quantile (0 <= q <= 1)"""
+        self._prepare()
+        if not self.means:
+            return None
+        if len(self.means) == 1 or q <= 0:
+            return self.min if q <= 0 else self.means[0]
+        if q >= 1:
+            return self.max
+
+        target = q * self.total_weight
+        cumulative = self._cumulative
+        idx = bisect_left(cumulative, target)
+        if idx == 0:
+            left, left_mean = 0.0, self.min
+            right, right_mean = cumulative[0], self.means[0]
+        elif idx == len(cumulative):
+            left, left_mean = cumulative[-1], self.means[-1]
+            right, right_mean = self.total_weight, self.max
+        else:
+            left, left_mean = cumulative[idx - 1], self.means[idx - 1]
+            right, right_mean = cumulative[idx], self.means[idx]
+
+        if right == left:
+            return left_mean
+        return left_mean + (right_mean - left_mean) * (target - left) / (right - left)
+
+
+class StreamingStats:
+    """Count, mean, min/max and quantile sketch for one metric"""
+    QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+    def __init__(self, compression=100):
+        self.count = 0
+        self.mean = 0.0
+        self.digest = TDigest(compression=compression)
+        self._percentiles = None
+
+    def add(self, value):
+        """Record a sample (seconds)"""
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.digest.add(value)
+        self._percentiles = None
+
+    def percentile(self, q):
+        """Return a cached percentile, recomputing only after new samples"""
+        cached = self.percentiles()
+        return cached[q] if q in cached else self.digest.quantile(q)
+
+    def percentiles(self):
+        """Standard dashboard percentiles, cached until the next sample"""
+        if self._percentiles is None:
+            self._percentiles = {q: self.digest.quantile(q) for q in self.QUANTILES}
+        return self._percentiles
+
+    def as_dict(self):
+        if not self.count:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None}
+        data = {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.digest.min,
+            'max': self.digest.max,
+        }
+        for q, value in self.percentiles().items():
+            data[f'p{int(q * 100)}'] = value
+        return data
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from apps.alerts import views
+
+urlpatterns = [
+    path('sites/<int:site_id>/response-stats/', views.response_stats, name='alert-response-stats'),
+]
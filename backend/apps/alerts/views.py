@@ -0,0 +1,54 @@
+from rest_framework import status, viewsets
+from rest_framework.decorators import action, api_view
+from rest_framework.response import Response
+
+from apps.alerts.models import Alert
+from apps.alerts.serializers import AlertSerializer
+from apps.alerts.services import InvalidTransition, alert_lifecycle
+
+
+class AlertViewSet(viewsets.ModelViewSet):
+    """Alerts; status transitions are routed through AlertLifecycleService"""
+    queryset = Alert.objects.select_related('site').all()
+    serializer_class = AlertSerializer
+    filterset_fields = ['site', 'status', 'severity', 'alert_type']
+
+    def _transition(self, request, method):
+        alert = self.get_object()
+        try:
+            if method == 'acknowledge':
+                alert_lifecycle.acknowledge(alert)
+            else:
+                getattr(alert_lifecycle, method)(alert, request.data.get('notes', ''))
+        except InvalidTransition as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(alert).data)
+
+    @action(detail=True, methods=['post'])
+    def acknowledge(self, request, pk=None):
+        return self._transition(request, 'acknowledge')
+
+    @action(detail=True, methods=['post'])
+    def resolve(self, request, pk=None):
+        return self._transition(request, 'resolve')
+
+    @action(detail=True, methods=['post'], url_path='false-positive')
+    def false_positive(self, request, pk=None):
+        return self._transition(request, 'mark_false_positive')
+
+    @action(detail=False, methods=['post'], url_path='bulk-acknowledge')
+    def bulk_acknowledge(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return Response({'error': 'ids must be a list of alert ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'acknowledged': alert_lifecycle.bulk_acknowledge(ids)})
+
+
+@api_view(['GET'])
+def response_stats(request, site_id):
+    """Response/resolution time summaries per severity, served from the shared cache"""
+    metric = request.query_params.get('metric', alert_lifecycle.RESPONSE)
+    if metric not in (alert_lifecycle.RESPONSE, alert_lifecycle.RESOLUTION):
+        return Response({'error': f'Unknown metric {metric}'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(alert_lifecycle.site_summary(site_id, metric))
@@ -3,9 +3,11 @@ Fall Detection Module for Construction Site Safety
 Implements advanced fall detection algorithms and safety monitoring
 """
 
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from apps.monitoring.models import Site, Camera, Zone, Worker
 from apps.detection.models import Detection
+from apps.detection.fall_prediction import EDGE_MULTIPLIERS, effective_distance
 import json
 
 
@@ -44,6 +46,7 @@ class FallDetection(models.Model):
     worker_position = models.JSONField(help_text="Worker coordinates")
     movement_velocity = models.FloatField(default=0.0, help_text="Movement speed m/s")
     movement_direction = models.JSONField(help_text="Movement vector")
+    time_to_edge = models.FloatField(null=True, blank=True, help_text="Predicted seconds until edge is reached")
     
     # Alert status
     alert_triggered = models.BooleanField(default=False)
@@ -66,16 +69,24 @@ class FallDetection(models.Model):
     def __str__(self):
         return f"Fall Detection - {self.worker} - {self.risk_level}"
     
-    def calculate_risk_score(self):
-        """Calculate comprehensive fall risk score"""
+    def calculate_risk_score(self, predictive=True):
+        """Calculate comprehensive fall risk score
+        
+        In predictive mode the distance is projected ahead using
+        `time_to_edge` so risk rises before the thresholds are crossed.
+        """
         score = 0
         
+        distance = self.distance_to_edge
+        if predictive:
+            distance = effective_distance(distance, self.time_to_edge)
+        
         # Distance to edge scoring
-        if self.distance_to_edge < 1.0:
+        if distance < 1.0:
             score += 40
-        elif self.distance_to_edge < 2.0:
+        elif distance < 2.0:
             score += 25
-        elif self.distance_to_edge < 3.0:
+        elif distance < 3.0:
             score += 10
         
         # Safety equipment scoring
@@ -92,14 +103,7 @@ class FallDetection(models.Model):
             score += 15
         
         # Edge type risk multiplier
-        edge_multipliers = {
-            'roof_edge': 1.5,
-            'building_edge': 1.4,
-            'scaffold_edge': 1.3,
-            'excavation_edge': 1.2,
-            'platform_edge': 1.1,
-        }
-        score *= edge_multipliers.get(self.edge_type, 1.0)
+        score *= EDGE_MULTIPLIERS.get(self.edge_type, 1.0)
         
         return min(score, 100)  # Cap at 100
     
@@ -120,7 +124,25 @@ class FallDetection(models.Model):
         """Override save to auto-calculate risk and alerts"""
         self.alert_level = self.determine_alert_level()
         self.alert_triggered = self.alert_level in ['warning', 'urgent', 'emergency']
+        created = self._state.adding
         super().save(*args, **kwargs)
+        if created:
+            self._enqueue_heatmap_sample()
+
+    def _enqueue_heatmap_sample(self):
+        """Queue this position and risk for the site's heatmap on commit"""
+        position = self.worker_position or {}
+        if 'x' not in position or 'y' not in position:
+            return
+        from apps.monitoring.heatmaps import enqueue_points
+
+        site_id = self.worker.site_id
+        sample = ((self.created_at or timezone.now()).timestamp(),
+                  position['x'], position['y'], self.calculate_risk_score())
+        # robust: a Redis outage loses the sample, never the committed save
+        transaction.on_commit(lambda: enqueue_points(
+            site_id, [sample[0]], [sample[1]], [sample[2]], [sample[3]]
+        ), robust=True)
 
 
 class SafetyFence(models.Model):
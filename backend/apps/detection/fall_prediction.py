@@ -0,0 +1,266 @@
+"""
+Predictive Fall Risk Scoring
+Estimates time-to-edge from each worker's recent trajectory and scores
+all tracked workers in one vectorized pass per tick
+"""
+
+import numpy as np
+
+
+# Seconds of look-ahead used to project workers toward edges
+PREDICTION_HORIZON = 3.0
+
+# Distance thresholds (meters) and points, mirroring FallDetection
+DISTANCE_POINTS = ((1.0, 40), (2.0, 25), (3.0, 10))
+FAST_MOVEMENT_SPEED = 2.0
+
+EDGE_TYPES = ('building_edge', 'scaffold_edge', 'excavation_edge', 'platform_edge', 'roof_edge')
+EDGE_MULTIPLIERS = {
+    'roof_edge': 1.5,
+    'building_edge': 1.4,
+    'scaffold_edge': 1.3,
+    'excavation_edge': 1.2,
+    'platform_edge': 1.1,
+}
+
+
+def effective_distance(distance, time_to_edge, horizon=PREDICTION_HORIZON):
+    """Distance to edge projected `horizon` seconds ahead at the current closing speed
+
+    Works on scalars and arrays; `time_to_edge` of None/inf means the worker
+    is not closing on the edge and the current distance is returned.
+    """
+    if time_to_edge is None:
+        return distance
+    distance = np.asarray(distance, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.clip(1.0 - horizon / np.asarray(time_to_edge, dtype=np.float64), 0.0, 1.0)
+    projected = np.where(np.isfinite(time_to_edge), distance * factor, distance)
+    return projected if projected.ndim else float(projected)
+
+
+class TrajectoryBuffer:
+    """Fixed-length ring buffer of (t, x, y) samples per worker
+
+    Storage is a pair of preallocated arrays indexed by slot, so a tick
+    touches no per-worker Python objects.
+    """
+
+    def __init__(self, history=16, capacity=256):
+        self.history = history
+        self.times = np.zeros((capacity, history), dtype=np.float64)
+        self.positions = np.zeros((capacity, history, 2), dtype=np.float32)
+        self.counts = np.zeros(capacity, dtype=np.int32)
+        self.heads = np.zeros(capacity, dtype=np.int32)
+        self.last_seen = np.full(capacity, -np.inf, dtype=np.float64)
+        self.slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        capacity = len(self.counts)
+        self.times = np.concatenate([self.times, np.zeros_like(self.times)])
+        self.positions = np.concatenate([self.positions, np.zeros_like(self.positions)])
+        self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        self.heads = np.concatenate([self.heads, np.zeros_like(self.heads)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(capacity, -np.inf)])
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def slots_for(self, worker_ids):
+        """Map worker ids to buffer slots, allocating slots for new workers"""
+        if len(set(worker_ids)) != len(worker_ids):
+            raise ValueError("Duplicate worker ids in one tick; send one position per worker")
+        slots = np.empty(len(worker_ids), dtype=np.intp)
+        for i, worker_id in enumerate(worker_ids):
+            slot = self.slots.get(worker_id)
+            if slot is None:
+                if not self._free:
+                    self._grow()
+                slot = self.slots[worker_id] = self._free.pop()
+                self.counts[slot] = 0
+                self.heads[slot] = 0
+            slots[i] = slot
+        return slots
+
+    def append(self, worker_ids, t, positions):
+        """Record one position per worker at time `t`; returns their slots"""
+        slots = self.slots_for(worker_ids)
+        heads = self.heads[slots]
+        self.times[slots, heads] = t
+        self.positions[slots, heads] = positions
+        self.heads[slots] = (heads + 1) % self.history
+        self.counts[slots] = np.minimum(self.counts[slots] + 1, self.history)
+        self.last_seen[slots] = t
+        return slots
+
+    def remove(self, worker_id):
+        """Forget a worker (e.g. when they leave the site)"""
+        slot = self.slots.pop(worker_id, None)
+        if slot is not None:
+            self.last_seen[slot] = -np.inf
+            self._free.append(slot)
+
+    def evict_idle(self, now, max_idle):
+        """Free slots of workers with no sample in the last `max_idle` seconds"""
+        if not self.slots:
+            return []
+        worker_ids = list(self.slots)
+        slots = np.fromiter(self.slots.values(), dtype=np.intp, count=len(worker_ids))
+        idle = np.flatnonzero(self.last_seen[slots] < now - max_idle)
+        evicted = [worker_ids[i] for i in idle]
+        for worker_id in evicted:
+            self.remove(worker_id)
+        return evicted
+
+    def velocities(self, slots):
+        """Least-squares velocity (m/s) over each worker's buffered samples"""
+        times = self.times[slots]
+        positions = self.positions[slots].astype(np.float64)
+        valid = np.arange(self.history)[None, :] < self.counts[slots][:, None]
+        weights = valid.astype(np.float64)
+        n = np.maximum(weights.sum(axis=1), 1.0)
+
+        t_mean = (weights * times).sum(axis=1) / n
+        dt = (times - t_mean[:, None]) * weights
+        p_mean = (weights[:, :, None] * positions).sum(axis=1) / n[:, None]
+        dp = positions - p_mean[:, None, :]
+
+        var = (dt * dt).sum(axis=1)
+        cov = (dt[:, :, None] * dp).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            velocity = cov / var[:, None]
+        velocity[var <= 1e-9] = 0.0
+        return velocity
+
+
+class FallRiskPredictor:
+    """Vectorized predictive fall-risk scoring for one site
+
+    Edges are line segments in site-local meters, shape (E, 4) as
+    (x1, y1, x2, y2), with a matching sequence of edge type names.
+    """
+
+    def __init__(self, edges, edge_types, horizon=PREDICTION_HORIZON, history=16, max_idle=60.0):
+        self.edges = np.asarray(edges, dtype=np.float64).reshape(-1, 4)
+        self.edge_multipliers = np.array(
+            [EDGE_MULTIPLIERS.get(edge_type, 1.0) for edge_type in edge_types], dtype=np.float64
+        )
+        self.edge_types = list(edge_types)
+        self.horizon = horizon
+        self.max_idle = max_idle
+        self.buffer = TrajectoryBuffer(history=history)
+        self._last_eviction = -np.inf
+
+        start = self.edges[:, :2]
+        direction = self.edges[:, 2:] - start
+        self._start = start
+        self._direction = direction
+        self._length_sq = np.maximum((direction ** 2).sum(axis=1), 1e-12)
+
+    def _edge_geometry(self, positions):
+        """Distance (N, E) and unit vector from nearest edge point to each worker"""
+        rel = positions[:, None, :] - self._start[None, :, :]
+        proj = np.clip((rel * self._direction[None]).sum(axis=2) / self._length_sq, 0.0, 1.0)
+        offset = rel - proj[:, :, None] * self._direction[None]
+        distance = np.sqrt((offset ** 2).sum(axis=2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normal = offset / distance[:, :, None]
+        normal[distance <= 1e-9] = 0.0
+        return distance, normal
+
+    def tick(self, worker_ids, positions, t, has_harness, harness_attached, has_hardhat):
+        """Ingest one position per worker and score every worker in the batch
+
+        Returns a dict of arrays aligned with `worker_ids`. Distance and
+        time-to-edge refer to the governing edge (the one whose projected
+        distance drives the score), so FallDetection.calculate_risk_score
+        reproduces `risk_score` from them. Workers with no sample for
+        `max_idle` seconds are dropped from the buffer.
+        """
+        if t - self._last_eviction >= self.max_idle / 4:
+            self.buffer.evict_idle(t, self.max_idle)
+            self._last_eviction = t
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        slots = self.buffer.append(worker_ids, t, positions)
+        velocity = self.buffer.velocities(slots)
+        speed = np.sqrt((velocity ** 2).sum(axis=1))
+
+        if not len(self.edges):
+            distance_e = np.full((len(positions), 1), np.inf)
+            tte_e = np.full_like(distance_e, np.inf)
+            multiplier_e = np.ones(1)
+        else:
+            distance_e, normal = self._edge_geometry(positions)
+            closing = -(normal * velocity[:, None, :]).sum(axis=2)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                tte_e = np.where(closing > 1e-6, distance_e / closing, np.inf)
+            multiplier_e = self.edge_multipliers
+
+        effective_e = effective_distance(distance_e, tte_e, self.horizon)
+        governing = effective_e.argmin(axis=1)
+        rows = np.arange(len(positions))
+        effective = effective_e[rows, governing]
+
+        score = np.zeros(len(positions), dtype=np.float64)
+        remaining = np.ones(len(positions), dtype=bool)
+        for threshold, points in DISTANCE_POINTS:
+            hit = remaining & (effective < threshold)
+            score[hit] += points
+            remaining &= ~hit
+
+        has_harness = np.asarray(has_harness, dtype=bool)
+        harness_attached = np.asarray(harness_attached, dtype=bool)
+        score += np.where(~has_harness, 30, np.where(~harness_attached, 20, 0))
+        score += np.where(np.asarray(has_hardhat, dtype=bool), 0, 10)
+        score += np.where(speed > FAST_MOVEMENT_SPEED, 15, 0)
+        score *= multiplier_e[governing]
+
+        return {
+            'distance_to_edge': distance_e[rows, governing],
+            'predicted_distance': effective,
+            'time_to_edge': tte_e[rows, governing],
+            'velocity': velocity,
+            'edge_index': governing,
+            'risk_score': np.minimum(score, 100),
+        }
+
+
+def annotate_fall_detections(predictor, fall_detections, t):
+    """Run one tick over unsaved FallDetection rows and fill in the predictive fields
+
+    Sets `distance_to_edge`, `edge_type` and `time_to_edge` (None when the
+    worker is not closing on the edge) from the governing edge, plus
+    `movement_velocity` and `movement_direction`, so `save()` scores each
+    row exactly as the tick did. Rows without an {x, y} worker_position,
+    and all but the latest row per worker, are skipped.
+    """
+    latest = {}
+    for fall_detection in fall_detections:
+        position = fall_detection.worker_position or {}
+        if 'x' in position and 'y' in position:
+            latest[fall_detection.worker_id] = fall_detection
+    if not latest:
+        return fall_detections
+
+    rows = list(latest.values())
+    result = predictor.tick(
+        list(latest),
+        [(row.worker_position['x'], row.worker_position['y']) for row in rows],
+        t,
+        [row.has_harness for row in rows],
+        [row.harness_attached for row in rows],
+        [row.has_hardhat for row in rows],
+    )
+    velocity = result['velocity']
+    speed = np.sqrt((velocity ** 2).sum(axis=1))
+    for i, row in enumerate(rows):
+        if predictor.edge_types:
+            row.distance_to_edge = float(result['distance_to_edge'][i])
+            row.edge_type = predictor.edge_types[result['edge_index'][i]]
+        time_to_edge = result['time_to_edge'][i]
+        row.time_to_edge = float(time_to_edge) if np.isfinite(time_to_edge) else None
+        row.movement_velocity = float(speed[i])
+        row.movement_direction = {'x': float(velocity[i, 0]), 'y': float(velocity[i, 1])}
+    return fall_detections
@@ -0,0 +1,292 @@
+"""
+Detection Snapshot Storage
+Encodes detection crops off the ingestion path, stores them content-addressed
+by digest, skips near-identical consecutive crops by perceptual hash and
+generates thumbnails for list views
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+SnapshotResult = namedtuple('SnapshotResult', ['key', 'url', 'thumbnail_url', 'deduplicated'])
+
+
+def dhash(image, size=8):
+    """64-bit difference hash of an image (robust to re-encoding and small shifts)"""
+    gray = image.convert('L').resize((size + 1, size), Image.BILINEAR)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class LocalFileStore:
+    """Sharded content-addressed file store under a root directory
+
+    Keys map to `<prefix>/<k[0:2]>/<k[2:4]>/<key>.jpg` so no directory grows
+    past a few hundred entries. Files are written to a temp name and renamed
+    into place; durability is provided by `sync()` in batches.
+    """
+
+    def __init__(self, root, base_url, prefix='snapshots'):
+        self.root = os.fspath(root)
+        self.base_url = base_url.rstrip('/') + '/'
+        self.prefix = prefix
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def relative_path(self, key, variant=''):
+        folder = f'{self.prefix}/{variant}' if variant else self.prefix
+        return f'{folder}/{key[:2]}/{key[2:4]}/{key}.jpg'
+
+    def path(self, key, variant=''):
+        return os.path.join(self.root, self.relative_path(key, variant))
+
+    def url(self, key, variant=''):
+        return self.base_url + self.relative_path(key, variant)
+
+    def exists(self, key, variant=''):
+        return os.path.exists(self.path(key, variant))
+
+    def write(self, key, data, variant=''):
+        """Atomically write `data`; returns the number of pending unsynced files"""
+        path = self.path(key, variant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._pending.add(path)
+            return len(self._pending)
+
+    def sync(self):
+        """fsync all files written since the last sync, then their directories"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        directories = set()
+        for path in pending:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            directories.add(os.path.dirname(path))
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        return len(pending)
+
+
+class SnapshotWriter:
+    """Asynchronous snapshot writer backed by a worker pool
+
+    Files are keyed by a digest of the encoded JPEG. A crop whose perceptual
+    hash is within `dedup_distance` bits of the previous crop from the same
+    stream is not stored again and reuses that snapshot. Work for one stream
+    runs in submission order; different streams run in parallel. Written
+    files are fsynced once `fsync_batch` are pending or, at low rates,
+    within `fsync_interval` seconds of the first unsynced write.
+    """
+
+    def __init__(self, store=None, workers=None, quality=None, thumbnail_size=None,
+                 dedup_distance=None, fsync_batch=None, fsync_interval=None):
+        config = self._config()
+        if store is None:
+            from django.conf import settings
+            store = LocalFileStore(settings.MEDIA_ROOT, settings.MEDIA_URL)
+        self.store = store
+        self.quality = quality or config['JPEG_QUALITY']
+        self.thumbnail_size = thumbnail_size or config['THUMBNAIL_SIZE']
+        self.dedup_distance = config['DEDUP_DISTANCE'] if dedup_distance is None else dedup_distance
+        self.fsync_batch = fsync_batch or config['FSYNC_BATCH']
+        self.fsync_interval = fsync_interval or config['FSYNC_INTERVAL']
+        self._flush_timer = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or config['WORKERS'], thread_name_prefix='snapshot'
+        )
+        self._streams = {}   # stream_key -> deque of pending (frame, bounding_box, future)
+        self._running = set()
+        self._last = {}      # stream_key -> (perceptual hash, SnapshotResult)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _config():
+        defaults = {
+            'WORKERS': 4,
+            'JPEG_QUALITY': 85,
+            'THUMBNAIL_SIZE': (160, 160),
+            'DEDUP_DISTANCE': 4,
+            'FSYNC_BATCH': 64,
+            'FSYNC_INTERVAL': 1.0,
+        }
+        try:
+            from django.conf import settings
+            defaults.update(getattr(settings, 'SNAPSHOT_CONFIG', {}))
+        except Exception:
+            pass
+        return defaults
+
+    def submit(self, frame, bounding_box=None, stream_key=None):
+        """Queue a crop for storage; returns a Future of SnapshotResult
+
+        `frame` is a PIL image or an RGB ndarray; `bounding_box` uses the
+        Detection format {x, y, width, height}.
+        """
+        future = Future()
+        with self._lock:
+            self._streams.setdefault(stream_key, deque()).append((frame, bounding_box, future))
+            if stream_key in self._running:
+                return future
+            self._running.add(stream_key)
+        self._executor.submit(self._drain, stream_key)
+        return future
+
+    def _drain(self, stream_key):
+        """Process one stream's queued crops in order"""
+        while True:
+            with self._lock:
+                pending = self._streams.get(stream_key)
+                if not pending:
+                    self._streams.pop(stream_key, None)
+                    self._running.discard(stream_key)
+                    return
+                frame, bounding_box, future = pending.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._process(frame, bounding_box, stream_key))
+            except Exception as exc:
+                future.set_exception(exc)
+
+    def submit_for_detection(self, detection, frame):
+        """Store the detection's crop and fill in `image_url` once written"""
+        future = self.submit(frame, detection.bounding_box, stream_key=detection.camera_id)
+        future.add_done_callback(lambda done: self._attach(detection.pk, done))
+        return future
+
+    @staticmethod
+    def _attach(detection_id, future):
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Snapshot for detection %s failed", detection_id, exc_info=exc)
+            return
+        from django.db import close_old_connections
+        from apps.detection.models import Detection
+
+        # Runs on pool threads, which Django's request cycle never cleans up
+        close_old_connections()
+        try:
+            Detection.objects.filter(pk=detection_id).update(image_url=future.result().url)
+        except Exception:
+            logger.exception("Could not attach snapshot to detection %s", detection_id)
+        finally:
+            close_old_connections()
+
+    def _process(self, frame, bounding_box, stream_key):
+        image = frame if isinstance(frame, Image.Image) else Image.fromarray(frame)
+        if bounding_box:
+            x, y = int(bounding_box['x']), int(bounding_box['y'])
+            image = image.crop((x, y, x + int(bounding_box['width']), y + int(bounding_box['height'])))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        # Only this stream's drain loop touches its entry, so no lock is needed
+        phash = dhash(image)
+        previous = self._last.get(stream_key)
+        if previous is not None and hamming(previous[0], phash) <= self.dedup_distance:
+            return previous[1]._replace(deduplicated=True)
+
+        data = self._encode(image)
+        key = hashlib.blake2b(data, digest_size=16).hexdigest()
+        deduplicated = self.store.exists(key)
+        if not deduplicated:
+            # Thumbnail first, so an existing full-size file implies both are present
+            thumbnail = image.copy()
+            thumbnail.thumbnail(self.thumbnail_size)
+            self.store.write(key, self._encode(thumbnail), 'thumbs')
+            pending = self.store.write(key, data)
+            if pending >= self.fsync_batch:
+                self.store.sync()
+            else:
+                self._schedule_flush()
+        result = SnapshotResult(key, self.store.url(key), self.store.url(key, 'thumbs'), deduplicated)
+        self._last[stream_key] = (phash, result._replace(deduplicated=False))
+        return result
+
+    def _encode(self, image):
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=self.quality, optimize=False)
+        return buffer.getvalue()
+
+    def _schedule_flush(self):
+        """Bound how long a written file can stay unsynced"""
+        with self._lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.fsync_interval, self._timed_flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.flush()
+        except OSError:
+            logger.exception("Periodic snapshot fsync failed")
+
+    def flush(self):
+        """Force pending writes to disk"""
+        return self.store.sync()
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            timer, self._flush_timer = self._flush_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_snapshot_writer():
+    """Process-wide SnapshotWriter, created on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter()
+        return _writer
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from apps.detection import views
+
+urlpatterns = [
+    path('batch/', views.ingest_batch, name='detection-batch'),
+    path('<int:pk>/snapshot/', views.upload_snapshot, name='detection-snapshot'),
+]
@@ -0,0 +1,49 @@
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from PIL import Image, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.decorators import api_view, parser_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+
+from apps.detection import wire
+from apps.detection.models import Detection
+from apps.detection.snapshots import get_snapshot_writer
+
+
+@api_view(['POST'])
+def ingest_batch(request):
+    """Bulk-ingest a binary detection batch uploaded by an edge device"""
+    if request.content_type != wire.CONTENT_TYPE:
+        return Response({'error': f'Expected {wire.CONTENT_TYPE}'},
+                        status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    try:
+        created = wire.bulk_ingest(request.body)
+    except wire.WireFormatError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError:
+        # A referenced camera, worker or zone was deleted during ingestion
+        return Response({'error': 'Batch references a missing camera, worker or zone'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response({'ingested': len(created)}, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def upload_snapshot(request, pk):
+    """Store the frame for a detection; `image_url` is filled in once written
+
+    The crop is cut from the uploaded `frame` using the detection's bounding
+    box and written off the request thread.
+    """
+    detection = get_object_or_404(Detection, pk=pk)
+    upload = request.FILES.get('frame')
+    if upload is None:
+        return Response({'error': 'Missing frame'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        frame = Image.open(upload)
+        frame.load()
+    except (UnidentifiedImageError, OSError):
+        return Response({'error': 'Frame is not a readable image'}, status=status.HTTP_400_BAD_REQUEST)
+    get_snapshot_writer().submit_for_detection(detection, frame)
+    return Response({'detection': detection.pk}, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,289 @@
+"""
+Binary Detection Wire Format
+Compact, versioned batch format for edge-to-backend detection upload, with
+a zero-copy NumPy decoder; records become Detection objects only in
+to_detections(), right before bulk_create
+
+Layout (little-endian):
+    header   magic 'SEDB' | version u8 | flags u8 | string_count u16 | record_count u32
+    body     string table: string_count x (length u8, utf-8 bytes)
+             records:      record_count x RECORD_DTYPE (52 bytes each)
+The body is zlib-compressed when FLAG_ZLIB is set.
+"""
+
+import struct
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+
+
+MAGIC = b'SEDB'
+VERSION = 1
+FLAG_ZLIB = 0x01
+CONTENT_TYPE = 'application/x-siteye-detections'
+
+HEADER = struct.Struct('<4sBBHI')
+
+# Mirrors Detection.DETECTION_TYPES ordering; append only (tests check they match)
+DETECTION_TYPES = ('person', 'vehicle', 'equipment', 'ppe', 'fall_risk', 'fence', 'workforce')
+
+# Detection.object_class max_length
+MAX_CLASS_LENGTH = 100
+
+# Capture times must be representable as datetimes (before year 10000)
+MAX_TIMESTAMP = 253402300800.0
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),       # epoch seconds
+    ('camera_id', '<u4'),
+    ('worker_id', '<i4'),       # -1 when unknown
+    ('zone_id', '<i4'),         # -1 when unknown
+    ('object_class', '<u2'),    # index into the string table
+    ('detection_type', 'u1'),   # index into DETECTION_TYPES
+    ('_pad', 'u1'),
+    ('confidence', '<f4'),
+    ('bbox', '<f4', (4,)),      # x, y, width, height
+    ('position', '<f4', (2,)),  # worker position, NaN when unknown
+])
+
+
+class WireFormatError(ValueError):
+    """Raised for malformed or unsupported detection batches"""
+
+
+class DetectionBatch:
+    """Decoded batch: a structured record array plus the class string table"""
+
+    def __init__(self, records, object_classes):
+        self.records = records
+        self.object_classes = object_classes
+
+    def __len__(self):
+        return len(self.records)
+
+    def class_names(self):
+        table = np.array(self.object_classes, dtype=object)
+        return table[self.records['object_class']]
+
+    def iter_dicts(self):
+        """Yield records in the JSON upload shape (slow path, for debugging)"""
+        for record in self.records:
+            x, y, width, height = record['bbox'].tolist()
+            position = record['position']
+            yield {
+                'timestamp': float(record['timestamp']),
+                'camera_id': int(record['camera_id']),
+                'worker_id': int(record['worker_id']) if record['worker_id'] >= 0 else None,
+                'zone_id': int(record['zone_id']) if record['zone_id'] >= 0 else None,
+                'detection_type': DETECTION_TYPES[record['detection_type']],
+                'object_class': self.object_classes[record['object_class']],
+                'confidence': float(record['confidence']),
+                'bounding_box': {'x': x, 'y': y, 'width': width, 'height': height},
+                'worker_position': None if np.isnan(position).any()
+                else {'x': float(position[0]), 'y': float(position[1])},
+            }
+
+
+def encode(detections, compress=False):
+    """Encode detection dicts (JSON upload shape) into a binary batch"""
+    records = np.zeros(len(detections), dtype=RECORD_DTYPE)
+    classes = {}
+    type_index = {name: i for i, name in enumerate(DETECTION_TYPES)}
+
+    for i, detection in enumerate(detections):
+        record = records[i]
+        record['timestamp'] = detection['timestamp']
+        record['camera_id'] = detection['camera_id']
+        record['worker_id'] = -1 if detection.get('worker_id') is None else detection['worker_id']
+        record['zone_id'] = -1 if detection.get('zone_id') is None else detection['zone_id']
+        record['object_class'] = classes.setdefault(detection['object_class'], len(classes))
+        record['detection_type'] = type_index[detection['detection_type']]
+        record['confidence'] = detection['confidence']
+        box = detection['bounding_box']
+        record['bbox'] = (box['x'], box['y'], box['width'], box['height'])
+        position = detection.get('worker_position')
+        record['position'] = (position['x'], position['y']) if position else (np.nan, np.nan)
+
+    if len(classes) > 0xFFFF:
+        raise WireFormatError("Too many distinct object classes in one batch")
+    table = bytearray()
+    for name in classes:
+        encoded = name.encode('utf-8')
+        if len(name) > MAX_CLASS_LENGTH or len(encoded) > 0xFF:
+            raise WireFormatError(f"Object class name too long: {name!r}")
+        table.append(len(encoded))
+        table += encoded
+
+    body = bytes(table) + records.tobytes()
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 6)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, VERSION, flags, len(classes), len(records)) + body
+
+
+def decode(data):
+    """Decode a binary batch
+
+    Uncompressed batches are not copied: the record array is a read-only
+    view over `data`.
+    """
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise WireFormatError("Truncated header")
+    magic, version, flags, string_count, record_count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise WireFormatError("Not a detection batch")
+    if version != VERSION:
+        raise WireFormatError(f"Unsupported wire format version {version}")
+
+    body = view[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        # The header bounds the body; never inflate past it
+        max_size = 256 * string_count + record_count * RECORD_DTYPE.itemsize
+        inflater = zlib.decompressobj()
+        try:
+            inflated = inflater.decompress(body, max(max_size, 1))
+        except zlib.error as exc:
+            raise WireFormatError(f"Corrupt compressed body: {exc}") from exc
+        if inflater.unconsumed_tail or len(inflated) > max_size:
+            raise WireFormatError("Compressed body is larger than the header allows")
+        if not inflater.eof:
+            raise WireFormatError("Truncated compressed body")
+        body = memoryview(inflated)
+
+    classes = []
+    offset = 0
+    for _ in range(string_count):
+        if offset >= len(body):
+            raise WireFormatError("Truncated string table")
+        length = body[offset]
+        try:
+            classes.append(bytes(body[offset + 1:offset + 1 + length]).decode('utf-8'))
+        except UnicodeDecodeError as exc:
+            raise WireFormatError(f"Object class name is not valid UTF-8: {exc}") from exc
+        if len(classes[-1]) > MAX_CLASS_LENGTH:
+            raise WireFormatError(f"Object class name longer than {MAX_CLASS_LENGTH} characters")
+        offset += 1 + length
+
+    if len(body) - offset != record_count * RECORD_DTYPE.itemsize:
+        raise WireFormatError("Record section length does not match record count")
+    records = np.frombuffer(body, dtype=RECORD_DTYPE, count=record_count, offset=offset)
+
+    if record_count:
+        if string_count == 0 or records['object_class'].max() >= string_count:
+            raise WireFormatError("Object class index out of range")
+        if records['detection_type'].max() >= len(DETECTION_TYPES):
+            raise WireFormatError("Detection type index out of range")
+        timestamps = records['timestamp']
+        if not ((timestamps >= 0) & (timestamps < MAX_TIMESTAMP)).all():
+            raise WireFormatError("Timestamp is not a finite epoch time")
+        if not (np.isfinite(records['confidence']).all() and np.isfinite(records['bbox']).all()):
+            raise WireFormatError("Confidence or bounding box is not finite")
+        if np.isinf(records['position']).any():
+            raise WireFormatError("Worker position is infinite (use NaN when unknown)")
+    return DetectionBatch(records, classes)
+
+
+def validate_references(batch):
+    """Raise WireFormatError if the batch names cameras, workers or zones that do not exist"""
+    from apps.monitoring.models import Camera, Worker, Zone
+
+    records = batch.records
+    for field, model in (('camera_id', Camera), ('worker_id', Worker), ('zone_id', Zone)):
+        ids = np.unique(records[field])
+        ids = ids[ids >= 0].tolist()
+        if not ids:
+            continue
+        missing = set(ids) - set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if missing:
+            shown = ', '.join(str(pk) for pk in sorted(missing)[:10])
+            raise WireFormatError(f"Unknown {field} in batch: {shown}")
+
+
+def to_detections(batch):
+    """Build unsaved Detection instances for bulk_create
+
+    `timestamp` is auto_now_add on the model, so bulk_create stamps ingest
+    time; bulk_ingest() writes the edge capture time afterwards.
+    """
+    from apps.detection.models import Detection
+
+    records = batch.records
+    names = batch.class_names()
+    types = np.array(DETECTION_TYPES, dtype=object)[records['detection_type']]
+    boxes = records['bbox'].tolist()
+    confidences = records['confidence'].tolist()
+    camera_ids = records['camera_id'].tolist()
+    worker_ids = records['worker_id'].tolist()
+    zone_ids = records['zone_id'].tolist()
+
+    return [
+        Detection(
+            camera_id=camera_ids[i],
+            detection_type=types[i],
+            object_class=names[i],
+            confidence=confidences[i],
+            bounding_box={'x': box[0], 'y': box[1], 'width': box[2], 'height': box[3]},
+            worker_id=worker_ids[i] if worker_ids[i] >= 0 else None,
+            zone_id=zone_ids[i] if zone_ids[i] >= 0 else None,
+        )
+        for i, box in enumerate(boxes)
+    ]
+
+
+def enqueue_heatmap_samples(batch):
+    """Queue records that carry a worker position for their site's heatmap"""
+    from apps.monitoring.heatmaps import enqueue_points
+    from apps.monitoring.models import Camera
+
+    records = batch.records
+    located = records[~np.isnan(records['position']).any(axis=1)]
+    if not len(located):
+        return
+    camera_ids = np.unique(located['camera_id'])
+    sites = dict(Camera.objects.filter(pk__in=camera_ids.tolist()).values_list('pk', 'site_id'))
+    site_of = np.array([sites.get(camera_id, -1) for camera_id in camera_ids.tolist()], dtype=np.int64)
+    site_ids = site_of[np.searchsorted(camera_ids, located['camera_id'])]
+    for site_id in np.unique(site_ids[site_ids >= 0]).tolist():
+        rows = located[site_ids == site_id]
+        enqueue_points(site_id, rows['timestamp'], rows['position'][:, 0], rows['position'][:, 1])
+
+
+def _write_capture_times(detections, timestamps):
+    """Overwrite auto_now_add timestamps with edge capture times in one UPDATE"""
+    from django.db import connection
+    from apps.detection.models import Detection
+
+    table = connection.ops.quote_name(Detection._meta.db_table)
+    column = connection.ops.quote_name(Detection._meta.get_field('timestamp').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} AS d SET {column} = to_timestamp(v.captured_at) "
+            f"FROM unnest(%s::bigint[], %s::double precision[]) AS v(id, captured_at) "
+            f"WHERE d.id = v.id",
+            [[detection.pk for detection in detections], timestamps.tolist()],
+        )
+    for detection, captured_at in zip(detections, timestamps.tolist()):
+        detection.timestamp = datetime.fromtimestamp(captured_at, tz=dt_timezone.utc)
+
+
+def bulk_ingest(data, batch_size=1000):
+    """Decode a binary batch, insert it with bulk_create and feed the heatmaps
+
+    Rows keep the edge capture time. Worker positions have no Detection
+    column; they go to the site heatmaps once the transaction commits.
+    """
+    from django.db import transaction
+    from apps.detection.models import Detection
+
+    batch = decode(data)
+    validate_references(batch)
+    with transaction.atomic():
+        created = Detection.objects.bulk_create(to_detections(batch), batch_size=batch_size)
+        if created:
+            _write_capture_times(created, batch.records['timestamp'])
+        # robust: a Redis outage must not turn a stored batch into a 500 (and a retry)
+        transaction.on_commit(lambda: enqueue_heatmap_samples(batch), robust=True)
+    return created
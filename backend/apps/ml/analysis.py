@@ -0,0 +1,62 @@
+"""
+Compliance Analysis Providers
+LLM-backed interpretation of detections; the OpenAI client is imported
+inside load() only
+"""
+
+import json
+from abc import ABC, abstractmethod
+
+
+class ComplianceAnalyzer(ABC):
+    """Provider interface for LLM compliance analysis"""
+
+    @abstractmethod
+    def load(self):
+        """Import dependencies and create clients"""
+
+    @abstractmethod
+    def analyze(self, detection_summary):
+        """Return {llm_analysis, compliance_status, risk_score, recommended_actions}"""
+
+
+class OpenAIComplianceAnalyzer(ComplianceAnalyzer):
+    """Compliance analysis using the OpenAI chat completions API"""
+    SYSTEM_PROMPT = (
+        "You are a construction safety officer applying OSHA construction standards. "
+        "Given a detection summary, reply with JSON containing: llm_analysis (string), "
+        "compliance_status (compliant|violation|warning|unknown), risk_score (0-1) and "
+        "recommended_actions (list of strings)."
+    )
+
+    def __init__(self, model='gpt-4o-mini', temperature=0.0):
+        self.model = model
+        self.temperature = temperature
+        self.client = None
+
+    def load(self):
+        from django.conf import settings
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    def analyze(self, detection_summary):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            temperature=self.temperature,
+            response_format={'type': 'json_object'},
+            messages=[
+                {'role': 'system', 'content': self.SYSTEM_PROMPT},
+                {'role': 'user', 'content': json.dumps(detection_summary, default=str)},
+            ],
+        )
+        try:
+            result = json.loads(response.choices[0].message.content)
+        except (TypeError, ValueError):
+            result = {}
+        return {
+            'llm_analysis': result.get('llm_analysis', ''),
+            'compliance_status': result.get('compliance_status', 'unknown'),
+            'risk_score': float(result.get('risk_score', 0.0)),
+            'recommended_actions': result.get('recommended_actions', []),
+        }
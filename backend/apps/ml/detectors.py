@@ -0,0 +1,65 @@
+"""
+Object Detection Providers
+Grounding DINO detector loaded on demand; torch and transformers are
+imported inside load() only
+"""
+
+from abc import ABC, abstractmethod
+
+
+class ObjectDetector(ABC):
+    """Provider interface for frame-level object detection"""
+
+    @abstractmethod
+    def load(self):
+        """Import dependencies and load weights"""
+
+    @abstractmethod
+    def detect(self, image, prompts):
+        """Return a list of {object_class, confidence, bounding_box} dicts"""
+
+
+class GroundingDinoDetector(ObjectDetector):
+    """Zero-shot detector using Grounding DINO via transformers"""
+
+    def __init__(self, model_id='IDEA-Research/grounding-dino-tiny', device=None,
+                 box_threshold=0.35, text_threshold=0.25):
+        self.model_id = model_id
+        self.device = device
+        self.box_threshold = box_threshold
+        self.text_threshold = text_threshold
+        self.model = None
+        self.processor = None
+
+    def load(self):
+        import torch
+        from transformers import AutoModelForZeroShotObjectDetection, AutoProcessor
+
+        self._torch = torch
+        self.device = self.device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.processor = AutoProcessor.from_pretrained(self.model_id)
+        self.model = AutoModelForZeroShotObjectDetection.from_pretrained(self.model_id).to(self.device)
+        self.model.eval()
+
+    def detect(self, image, prompts):
+        text = '. '.join(prompts) + '.'
+        inputs = self.processor(images=image, text=text, return_tensors='pt').to(self.device)
+        with self._torch.no_grad():
+            outputs = self.model(**inputs)
+        results = self.processor.post_process_grounded_object_detection(
+            outputs,
+            inputs.input_ids,
+            box_threshold=self.box_threshold,
+            text_threshold=self.text_threshold,
+            target_sizes=[image.size[::-1]],
+        )[0]
+
+        detections = []
+        for score, label, box in zip(results['scores'], results['labels'], results['boxes']):
+            x1, y1, x2, y2 = box.tolist()
+            detections.append({
+                'object_class': label,
+                'confidence': float(score),
+                'bounding_box': {'x': x1, 'y': y1, 'width': x2 - x1, 'height': y2 - y1},
+            })
+        return detections
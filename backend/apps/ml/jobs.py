@@ -0,0 +1,93 @@
+"""
+ML Job Queue
+API processes enqueue detection and analysis jobs on per-role Redis lists;
+role workers (manage.py run_ml_worker) pop them, run the role's provider and
+store the result for the caller to poll
+"""
+
+import json
+import logging
+import os
+import uuid
+
+from django.conf import settings
+
+from apps.ml.providers import get_provider
+
+logger = logging.getLogger(__name__)
+
+
+# job type -> (process role that serves it, provider it runs)
+JOB_TYPES = {
+    'detect': ('inference', 'detector'),
+    'analyze': ('analysis', 'compliance_analyzer'),
+}
+RESULT_TTL = 60 * 60
+
+
+def queue_key(role):
+    return f'ml:jobs:{role}'
+
+
+def result_key(job_id):
+    return f'ml:result:{job_id}'
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def submit(job_type, **params):
+    """Queue a job for the role that serves `job_type`; returns the job id"""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown ML job type '{job_type}'")
+    role, _ = JOB_TYPES[job_type]
+    job_id = uuid.uuid4().hex
+    _redis().rpush(queue_key(role), json.dumps({'id': job_id, 'type': job_type, 'params': params}))
+    return job_id
+
+
+def result(job_id):
+    """Finished job result ({'result': ...} or {'error': ...}), or None while pending"""
+    data = _redis().get(result_key(job_id))
+    return None if data is None else json.loads(data)
+
+
+def _media_path(relative):
+    """Resolve a MEDIA_ROOT-relative path, refusing paths that escape it"""
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Image path outside MEDIA_ROOT: {relative!r}")
+    return path
+
+
+def run(job):
+    """Execute one job in this process with the role's provider"""
+    _, provider_name = JOB_TYPES[job['type']]
+    provider = get_provider(provider_name)
+    params = job['params']
+    if job['type'] == 'detect':
+        from PIL import Image
+
+        with Image.open(_media_path(params['image'])) as image:
+            return provider.detect(image.convert('RGB'), params['prompts'])
+    return provider.analyze(params['detection_summary'])
+
+
+def serve(role, timeout=5, should_stop=lambda: False):
+    """Pop and run jobs for `role` until `should_stop()` returns true"""
+    redis = _redis()
+    key = queue_key(role)
+    while not should_stop():
+        item = redis.blpop(key, timeout=timeout)
+        if item is None:
+            continue
+        job = json.loads(item[1])
+        try:
+            outcome = {'result': run(job)}
+        except Exception as exc:
+            logger.exception("ML job %s (%s) failed", job.get('id'), job.get('type'))
+            outcome = {'error': str(exc)}
+        redis.set(result_key(job['id']), json.dumps(outcome, default=str), ex=RESULT_TTL)
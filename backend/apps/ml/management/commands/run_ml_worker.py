@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ml import jobs, providers
+
+
+class Command(BaseCommand):
+    help = "Run an ML role worker: preload the role's providers and serve its job queue"
+
+    def handle(self, *args, **options):
+        role = providers.current_role()
+        if role == 'api':
+            raise CommandError("Set PROCESS_ROLE=inference or PROCESS_ROLE=analysis to run an ML worker")
+
+        loaded = providers.warm_up(role)
+        self.stdout.write(f"{role} worker ready; providers loaded: {', '.join(loaded) or 'none'}; "
+                          f"serving {jobs.queue_key(role)}")
+        try:
+            jobs.serve(role)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,91 @@
+"""
+Lazy ML Provider Registry
+Heavy ML backends (torch, transformers, langchain, openai, opencv) are only
+imported when a provider is first used, so API workers never pay for them
+"""
+
+import importlib
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised when a provider is requested by a role that must not load it"""
+
+
+class LazyProvider:
+    """Imports and constructs a provider class on first access"""
+
+    def __init__(self, name, path, options=None):
+        self.name = name
+        self.path = path
+        self.options = options or {}
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._instance is not None
+
+    def get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    module_path, _, class_name = self.path.rpartition('.')
+                    provider_class = getattr(importlib.import_module(module_path), class_name)
+                    instance = provider_class(**self.options)
+                    instance.load()
+                    self._instance = instance
+        return self._instance
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def current_role():
+    """Process role from settings: 'api', 'inference' or 'analysis'"""
+    role = getattr(settings, 'PROCESS_ROLE', 'api')
+    if role not in settings.PROCESS_ROLES:
+        raise ImproperlyConfigured(f"Unknown PROCESS_ROLE '{role}'")
+    return role
+
+
+def _lazy(name):
+    provider = _registry.get(name)
+    if provider is None:
+        with _registry_lock:
+            provider = _registry.get(name)
+            if provider is None:
+                try:
+                    config = settings.ML_PROVIDERS[name]
+                except KeyError:
+                    raise ImproperlyConfigured(f"No ML provider named '{name}'")
+                provider = _registry[name] = LazyProvider(name, config['CLASS'], config.get('OPTIONS'))
+    return provider
+
+
+def get_provider(name):
+    """Return the (lazily loaded) provider instance for this process
+
+    Providers not listed for the current role raise ProviderUnavailable;
+    API workers should enqueue work for an inference/analysis worker instead.
+    """
+    role = current_role()
+    if name not in settings.PROCESS_ROLES[role]['PROVIDERS']:
+        raise ProviderUnavailable(f"Provider '{name}' is not available in the '{role}' role")
+    return _lazy(name).get()
+
+
+def warm_up(role=None):
+    """Eagerly load the providers a role preloads (call from worker startup)"""
+    role = role or current_role()
+    for name in settings.PROCESS_ROLES[role].get('PRELOAD', []):
+        _lazy(name).get()
+    return loaded_providers()
+
+
+def loaded_providers():
+    return [name for name, provider in _registry.items() if provider.loaded]
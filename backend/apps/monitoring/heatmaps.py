@@ -0,0 +1,296 @@
+"""
+Heatmap Tile Generation
+Aggregates worker positions and fall-risk scores into multi-resolution grid
+tiles per site and time bucket, and publishes encoded tiles with ETags to
+the cache so map requests never touch raw detections
+
+Ingestion paths push samples onto a per-site Redis list with
+enqueue_points(); the site scheduler's `heatmap_update` task drains it on
+the one worker that owns the site, so each tile has a single writer.
+"""
+
+import hashlib
+import io
+import json
+import math
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+
+LAYERS = ('density', 'risk')
+FORMATS = {'png': 'image/png', 'json': 'application/json'}
+
+# Sample rows on the ingestion queue: epoch seconds, x, y, risk (NaN = none)
+SAMPLE_DTYPE = np.dtype('<f8')
+SAMPLE_FIELDS = 4
+
+
+def heatmap_config():
+    config = {
+        'CELL_SIZE': 0.5,            # meters per cell at the finest level
+        'MAX_LEVEL': 6,              # levels 0 (coarsest) .. MAX_LEVEL (finest)
+        'TILE_CELLS': 64,            # cells per tile edge
+        'ORIGIN_OFFSET': 10000.0,    # meters; site-local coords >= -offset map to tiles >= 0
+        'BUCKET_SECONDS': 3600,      # time bucket width
+        'RETAIN_BUCKETS': 2,         # buckets aggregated in memory per site (current + previous)
+        'DENSITY_SATURATION': 2.0,   # samples per m2 per bucket at full colour
+        'FORMATS': ('png',),
+        'CACHE_TIMEOUT': 60 * 60 * 24,
+        'DRAIN_BATCH': 500,          # queued payloads drained per update task
+    }
+    config.update(getattr(settings, 'HEATMAP_CONFIG', {}))
+    return config
+
+
+def time_bucket(timestamp, config=None):
+    """Index of the time bucket containing `timestamp`"""
+    config = config or heatmap_config()
+    return int(timestamp.timestamp() // config['BUCKET_SECONDS'])
+
+
+def tile_cache_key(site_id, bucket, layer, z, x, y, fmt):
+    return f'heatmap:{site_id}:{bucket}:{layer}:{z}:{x}:{y}.{fmt}'
+
+
+def queue_key(site_id):
+    return f'heatmap:queue:{site_id}'
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def enqueue_points(site_id, timestamps, xs, ys, risks=None):
+    """Queue samples for the site's heatmap owner (called from ingestion)
+
+    `timestamps` are epoch seconds; `risks` may contain NaN for samples
+    that only count towards density.
+    """
+    xs = np.asarray(xs, dtype=SAMPLE_DTYPE).ravel()
+    if not len(xs):
+        return
+    samples = np.empty((len(xs), SAMPLE_FIELDS), dtype=SAMPLE_DTYPE)
+    samples[:, 0] = timestamps
+    samples[:, 1] = xs
+    samples[:, 2] = np.asarray(ys, dtype=SAMPLE_DTYPE).ravel()
+    samples[:, 3] = np.nan if risks is None else np.asarray(risks, dtype=SAMPLE_DTYPE).ravel()
+    _redis().rpush(queue_key(site_id), samples.tobytes())
+
+
+def drain_points(site_id, max_items):
+    """Pop up to `max_items` queued payloads for a site as one (N, 4) array"""
+    key = queue_key(site_id)
+    pipe = _redis().pipeline()
+    pipe.lrange(key, 0, max_items - 1)
+    pipe.ltrim(key, max_items, -1)
+    payloads, _ = pipe.execute()
+    if not payloads:
+        return np.empty((0, SAMPLE_FIELDS), dtype=SAMPLE_DTYPE)
+    return np.frombuffer(b''.join(payloads), dtype=SAMPLE_DTYPE).reshape(-1, SAMPLE_FIELDS)
+
+
+class Tile:
+    """Per-cell count, risk sum/count and risk max for one tile"""
+    __slots__ = ('count', 'risk_sum', 'risk_count', 'risk_max')
+
+    def __init__(self, cells):
+        self.count = np.zeros((cells, cells), dtype=np.float32)
+        self.risk_sum = np.zeros((cells, cells), dtype=np.float32)
+        self.risk_count = np.zeros((cells, cells), dtype=np.float32)
+        self.risk_max = np.zeros((cells, cells), dtype=np.float32)
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def layer(self, name):
+        if name == 'density':
+            return self.count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.risk_count > 0, self.risk_sum / self.risk_count, 0.0)
+
+
+class HeatmapAggregator:
+    """Incrementally maintained heatmap pyramid for the sites one worker owns
+
+    Every sample updates one cell at each level, so coarse tiles never need
+    to be rebuilt from finer ones. Positions are site-local meters; the grid
+    origin sits ORIGIN_OFFSET meters below and left of the site origin so
+    tile indexes are never negative.
+
+    Only the newest RETAIN_BUCKETS buckets per site are held in memory (the
+    state is pickled on every scheduler handoff); older tiles live on in the
+    cache, and samples that arrive for them are dropped.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or heatmap_config()
+        self.cells = self.config['TILE_CELLS']
+        self.max_level = self.config['MAX_LEVEL']
+        self.cell_sizes = [
+            self.config['CELL_SIZE'] * 2 ** (self.max_level - z) for z in range(self.max_level + 1)
+        ]
+        # Whole level-0 tiles, so tile boundaries line up at every level
+        span = self.cell_sizes[0] * self.cells
+        self.origin_offset = math.ceil(self.config['ORIGIN_OFFSET'] / span) * span
+        self._tiles = {}   # (site_id, bucket) -> {(z, x, y): Tile}
+        self._newest = {}  # site_id -> newest bucket seen
+        self._dirty = set()
+        self.dropped = 0   # late samples for buckets no longer in memory
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Resident state is handed between site workers by pickling
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add_samples(self, site_id, samples):
+        """Add an (N, 4) array of (epoch seconds, x, y, risk) rows"""
+        if not len(samples):
+            return
+        buckets = (samples[:, 0] // self.config['BUCKET_SECONDS']).astype(np.int64)
+        for bucket in np.unique(buckets):
+            rows = samples[buckets == bucket]
+            self._add(site_id, int(bucket), rows[:, 1], rows[:, 2], rows[:, 3])
+
+    def add_points(self, site_id, timestamp, xs, ys, risks=None):
+        """Add a batch of positions (and optional 0-100 risk scores) at one time"""
+        xs = np.asarray(xs, dtype=np.float64).ravel()
+        risks = np.full(len(xs), np.nan) if risks is None else np.asarray(risks, dtype=np.float64)
+        self._add(site_id, time_bucket(timestamp, self.config), xs,
+                  np.asarray(ys, dtype=np.float64).ravel(), risks.ravel())
+
+    def _add(self, site_id, bucket, xs, ys, risks):
+        xs = xs + self.origin_offset
+        ys = ys + self.origin_offset
+        inside = (xs >= 0) & (ys >= 0) & np.isfinite(xs) & np.isfinite(ys)
+        xs, ys, risks = xs[inside], ys[inside], risks[inside].astype(np.float32)
+        if not len(xs):
+            return
+        has_risk = ~np.isnan(risks)
+
+        with self._lock:
+            newest = max(self._newest.get(site_id, bucket), bucket)
+            if bucket <= newest - self.config['RETAIN_BUCKETS']:
+                # Rebuilding an evicted bucket would overwrite its full cached tiles
+                self.dropped += len(xs)
+                return
+            tiles = self._tiles.get((site_id, bucket))
+            if tiles is None:
+                tiles = self._tiles[(site_id, bucket)] = {}
+            if newest != self._newest.get(site_id):
+                self._newest[site_id] = newest
+                self._evict(site_id, newest)
+            for z, cell_size in enumerate(self.cell_sizes):
+                gx = np.floor(xs / cell_size).astype(np.int64)
+                gy = np.floor(ys / cell_size).astype(np.int64)
+                tx, cx = np.divmod(gx, self.cells)
+                ty, cy = np.divmod(gy, self.cells)
+                for key in set(zip(tx.tolist(), ty.tolist())):
+                    mask = (tx == key[0]) & (ty == key[1])
+                    tile = tiles.get((z,) + key)
+                    if tile is None:
+                        tile = tiles[(z,) + key] = Tile(self.cells)
+                    np.add.at(tile.count, (cy[mask], cx[mask]), 1)
+                    risk_mask = mask & has_risk
+                    if risk_mask.any():
+                        cells = (cy[risk_mask], cx[risk_mask])
+                        np.add.at(tile.risk_sum, cells, risks[risk_mask])
+                        np.add.at(tile.risk_count, cells, 1)
+                        np.maximum.at(tile.risk_max, cells, risks[risk_mask])
+                    self._dirty.add((site_id, bucket, z) + key)
+
+    def _evict(self, site_id, newest_bucket):
+        oldest = newest_bucket - self.config['RETAIN_BUCKETS']
+        for key in [key for key in self._tiles if key[0] == site_id and key[1] <= oldest]:
+            del self._tiles[key]
+
+    def get_tile(self, site_id, bucket, z, x, y):
+        return self._tiles.get((site_id, bucket), {}).get((z, x, y))
+
+    def publish(self):
+        """Encode dirty tiles and push them, with their ETags, to the cache"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            snapshot = []
+            for site_id, bucket, z, x, y in dirty:
+                tile = self.get_tile(site_id, bucket, z, x, y)
+                if tile is not None:
+                    snapshot.append(((site_id, bucket, z, x, y), {
+                        layer: tile.layer(layer).copy() for layer in LAYERS
+                    }, tile.risk_max.copy(), tile.count.copy()))
+
+        entries = {}
+        for (site_id, bucket, z, x, y), layers, risk_max, count in snapshot:
+            scale = self.config['DENSITY_SATURATION'] * self.cell_sizes[z] ** 2
+            for layer, values in layers.items():
+                for fmt in self.config['FORMATS']:
+                    body = encode_tile(values, layer, fmt, count=count, risk_max=risk_max,
+                                       density_scale=scale)
+                    etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+                    key = tile_cache_key(site_id, bucket, layer, z, x, y, fmt)
+                    entries[key] = (etag, body)
+                    entries[key + ':etag'] = etag
+        if entries:
+            cache.set_many(entries, timeout=self.config['CACHE_TIMEOUT'])
+        return len(snapshot)
+
+
+def _colorize(values, layer, density_scale):
+    """Map values to RGBA on a fixed scale: transparent -> yellow -> red
+
+    Density saturates at `density_scale` samples per cell (a per-level
+    constant), so neighbouring tiles share one scale and a tile's colours
+    only change where its own cells change.
+    """
+    if layer == 'risk':
+        norm = np.clip(values / 100.0, 0.0, 1.0)
+    else:
+        norm = np.clip(np.log1p(values) / math.log1p(density_scale), 0.0, 1.0)
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 1] = (255 * (1.0 - norm)).astype(np.uint8)
+    rgba[..., 3] = np.where(values > 0, 80 + 175 * norm, 0).astype(np.uint8)
+    return rgba
+
+
+def encode_tile(values, layer, fmt, count=None, risk_max=None, density_scale=1.0):
+    """Encode one tile layer as PNG or sparse JSON"""
+    if fmt == 'png':
+        from PIL import Image
+
+        # Grid rows grow with y; image rows grow downward
+        image = Image.fromarray(_colorize(values, layer, density_scale)[::-1], 'RGBA')
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', optimize=False)
+        return buffer.getvalue()
+    if fmt == 'json':
+        rows, cols = np.nonzero(count if count is not None else values)
+        cells = [[int(col), int(row), round(float(values[row, col]), 3)] for row, col in zip(rows, cols)]
+        if risk_max is not None and layer == 'risk':
+            for cell, row, col in zip(cells, rows, cols):
+                cell.append(round(float(risk_max[row, col]), 3))
+        return json.dumps({'layer': layer, 'size': values.shape[0], 'cells': cells},
+                          separators=(',', ':')).encode()
+    raise ValueError(f"Unsupported tile format '{fmt}'")
+
+
+def cached_tile(site_id, bucket, layer, z, x, y, fmt):
+    """Return (etag, body) from the cache, or None if the tile is empty"""
+    return cache.get(tile_cache_key(site_id, bucket, layer, z, x, y, fmt))
+
+
+def cached_tile_etag(site_id, bucket, layer, z, x, y, fmt):
+    return cache.get(tile_cache_key(site_id, bucket, layer, z, x, y, fmt) + ':etag')
@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from prometheus_client import Gauge, start_http_server
+
+from apps.monitoring.models import Site
+from apps.monitoring.scheduling import SiteScheduler
+
+SITE_LAG = Gauge('siteye_site_lag_seconds', 'Age of the oldest unfinished task per site', ['site'])
+SITE_PENDING = Gauge('siteye_site_pending_tasks', 'Queued tasks per site', ['site'])
+SCHEDULER_WORKERS = Gauge('siteye_site_scheduler_workers', 'Live site worker processes')
+TASK_INTERVAL = Gauge('siteye_site_task_interval_seconds', 'Configured periodic task interval', ['task'])
+SKIPPED_TASKS = Gauge('siteye_site_skipped_tasks', 'Sites skipped on the last run because the task was unfinished', ['task'])
+
+
+class Command(BaseCommand):
+    help = "Run the site-sharded scheduler: periodic per-site checks on resident worker processes"
+
+    def add_arguments(self, parser):
+        config = settings.SITE_SCHEDULER
+        parser.add_argument('--workers', type=int, default=config['WORKERS'])
+        parser.add_argument('--metrics-port', type=int, default=config['METRICS_PORT'])
+
+    def handle(self, *args, **options):
+        config = settings.SITE_SCHEDULER
+        start_http_server(options['metrics_port'])
+
+        # Forked workers must open their own database connections
+        connections.close_all()
+        scheduler = SiteScheduler(config['HANDLERS'], state_factory=config['STATE_FACTORY'])
+        for index in range(options['workers']):
+            scheduler.add_worker(f'site-worker-{index}')
+        intervals = config['PERIODIC_TASKS']
+        schedule = ', '.join(f'{task} every {interval}s' for task, interval in intervals.items())
+        self.stdout.write(f"Scheduling {schedule} on {options['workers']} workers; "
+                          f"metrics on :{options['metrics_port']}")
+
+        for task, interval in intervals.items():
+            TASK_INTERVAL.labels(task=task).set(interval)
+        next_run = dict.fromkeys(intervals, time.monotonic())
+        next_worker = options['workers']
+        try:
+            while True:
+                for worker_id in scheduler.reap_dead_workers():
+                    self.stderr.write(f"{worker_id} died; starting a replacement")
+                    scheduler.add_worker(f'site-worker-{next_worker}')
+                    next_worker += 1
+
+                now = time.monotonic()
+                due = [task for task, at in next_run.items() if now >= at]
+                if due:
+                    site_ids = list(Site.objects.filter(is_active=True).values_list('pk', flat=True))
+                    connections.close_all()
+                    for task in due:
+                        submitted = scheduler.schedule_periodic(site_ids, task)
+                        SKIPPED_TASKS.labels(task=task).set(len(site_ids) - len(submitted))
+                        next_run[task] += intervals[task]
+
+                self._export_metrics(scheduler)
+                for site_id, error in ((e[0], e[2]) for e in scheduler.errors):
+                    self.stderr.write(f"site {site_id}: {error}")
+                scheduler.errors.clear()
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduler.shutdown()
+
+    @staticmethod
+    def _export_metrics(scheduler):
+        for site_id, item in scheduler.lag().items():
+            SITE_LAG.labels(site=str(site_id)).set(item['lag_seconds'])
+            SITE_PENDING.labels(site=str(site_id)).set(item['pending'])
+        SCHEDULER_WORKERS.set(len(scheduler.ring.nodes))
@@ -0,0 +1,359 @@
+"""
+Site-Sharded Worker Scheduling
+Consistently hashes Site ids onto worker processes so per-site state
+(trackers, zone indexes, rule caches) stays resident on one worker, and
+hands that state over when workers join or leave
+"""
+
+import hashlib
+import importlib
+import multiprocessing
+from multiprocessing.connection import wait
+import queue
+import time
+import traceback
+from bisect import bisect
+from collections import deque
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+
+
+def import_string(path):
+    module_path, _, name = path.rpartition('.')
+    return getattr(importlib.import_module(module_path), name)
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self._keys = []
+        self._owners = []
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        points = sorted(zip(self._keys, self._owners))
+        points += [(_hash(f'{node}#{i}'), node) for i in range(self.replicas)]
+        points.sort()
+        self._keys = [key for key, _ in points]
+        self._owners = [owner for _, owner in points]
+
+    def remove(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        points = [(key, owner) for key, owner in zip(self._keys, self._owners) if owner != node]
+        self._keys = [key for key, _ in points]
+        self._owners = [owner for _, owner in points]
+
+    def owner(self, site_id):
+        if not self._keys:
+            return None
+        index = bisect(self._keys, _hash(site_id)) % len(self._keys)
+        return self._owners[index]
+
+
+def run_site_worker(worker_id, inbox, outbox, handlers, state_factory, report_interval=0.2):
+    """Worker process loop: executes site tasks against resident per-site state
+
+    Messages in:  ('task', site_id, seq, name, payload)
+                  ('adopt', site_id, state)
+                  ('release', site_ids)
+                  ('stop',)
+    Messages out: ('progress', worker_id, {site_id: seq}, errors)
+                  ('released', worker_id, {site_id: state})
+
+    `outbox` is this worker's own pipe, so a killed worker cannot leave a
+    shared queue lock held and stall the others.
+    """
+    handlers = {name: import_string(path) for name, path in handlers.items()}
+    make_state = import_string(state_factory) if state_factory else (lambda site_id: {})
+    states = {}
+    progress = {}
+    errors = []
+    last_report = time.monotonic()
+
+    def report():
+        nonlocal progress, errors, last_report
+        if progress or errors:
+            outbox.send(('progress', worker_id, progress, errors))
+            progress, errors = {}, []
+        last_report = time.monotonic()
+
+    while True:
+        try:
+            message = inbox.get(timeout=report_interval)
+        except queue.Empty:
+            report()
+            continue
+
+        kind = message[0]
+        if kind == 'task':
+            _, site_id, seq, name, payload = message
+            state = states.get(site_id)
+            if state is None:
+                state = states[site_id] = make_state(site_id)
+            try:
+                handlers[name](site_id, state, payload)
+            except Exception:
+                errors.append((site_id, seq, traceback.format_exc()))
+            progress[site_id] = seq
+        elif kind == 'adopt':
+            _, site_id, state = message
+            states[site_id] = state if state is not None else make_state(site_id)
+        elif kind == 'release':
+            report()
+            outbox.send(('released', worker_id, {
+                site_id: states.pop(site_id, None) for site_id in message[1]
+            }))
+        elif kind == 'stop':
+            report()
+            outbox.send(('released', worker_id, states))
+            return
+
+        if time.monotonic() - last_report >= report_interval:
+            report()
+
+
+class SiteScheduler:
+    """Routes per-site tasks to worker processes by consistent hashing
+
+    `handlers` maps task names to dotted paths of `handler(site_id, state, payload)`
+    callables; `state_factory` is the dotted path of `factory(site_id)` that
+    builds the resident state for a site the first time it is seen.
+    """
+
+    def __init__(self, handlers, state_factory=None, replicas=64, handoff_timeout=30.0,
+                 context=None):
+        self.handlers = dict(handlers)
+        self.state_factory = state_factory
+        self.handoff_timeout = handoff_timeout
+        self.ring = HashRing(replicas=replicas)
+        self._context = context or multiprocessing.get_context()
+        self._readers = {}
+        self._workers = {}
+        self._seq = {}
+        self._pending = {}
+        self._released = {}
+        self.errors = []
+
+    # Worker membership
+
+    def add_worker(self, worker_id):
+        """Start a worker and move the sites it now owns over with their state"""
+        self.reap_dead_workers()
+        inbox = self._context.Queue()
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=run_site_worker,
+            args=(worker_id, inbox, writer, self.handlers, self.state_factory),
+            name=f'site-worker-{worker_id}',
+            daemon=True,
+        )
+        process.start()
+        writer.close()
+        self._readers[reader] = worker_id
+        before = self._assignments()
+        self._workers[worker_id] = (process, inbox)
+        self.ring.add(worker_id)
+        self._rebalance(before)
+
+    def remove_worker(self, worker_id):
+        """Drain a worker, hand its sites to their new owners and stop it"""
+        if worker_id not in self._workers:
+            return
+        if not self._workers[worker_id][0].is_alive():
+            self.reap_dead_workers()
+            return
+        before = self._assignments()
+        self.ring.remove(worker_id)
+        self._rebalance(before)
+        process, inbox = self._workers.pop(worker_id)
+        inbox.put(('stop',))
+        self._await_release(worker_id, process)
+        process.join(self.handoff_timeout)
+
+    def reap_dead_workers(self):
+        """Drop crashed workers from the ring and resubmit their unfinished tasks
+
+        Per-site state held by a crashed worker is lost; the new owner builds
+        it again with the state factory. Tasks the dead worker finished but
+        had not yet reported run again (at-least-once).
+        """
+        dead = [worker_id for worker_id, (process, _) in self._workers.items()
+                if not process.is_alive()]
+        if not dead:
+            return dead
+        self.poll()
+        before = self._assignments()
+        for worker_id in dead:
+            _, inbox = self._workers.pop(worker_id)
+            # Nobody will read this inbox again; don't block exit flushing it
+            inbox.cancel_join_thread()
+            inbox.close()
+            self.ring.remove(worker_id)
+            self._released.pop(worker_id, None)
+        self._resubmit([site_id for site_id, owner in before.items() if owner in dead])
+        return dead
+
+    def _resubmit(self, site_ids):
+        """Send the unfinished tasks of `site_ids` to their current owners"""
+        for site_id in site_ids:
+            pending = self._pending.get(site_id)
+            if not pending:
+                continue
+            owner = self.ring.owner(site_id)
+            if owner is None:
+                self.errors.extend((site_id, seq, "No site workers left") for seq, *_ in pending)
+                pending.clear()
+                continue
+            inbox = self._workers[owner][1]
+            for seq, _, name, payload in pending:
+                inbox.put(('task', site_id, seq, name, payload))
+
+    def _assignments(self):
+        return {site_id: self.ring.owner(site_id) for site_id in self._seq}
+
+    def _rebalance(self, before):
+        moves = {}
+        for site_id, old_owner in before.items():
+            new_owner = self.ring.owner(site_id)
+            if old_owner is not None and old_owner != new_owner:
+                moves.setdefault(old_owner, []).append((site_id, new_owner))
+
+        for old_owner, sites in moves.items():
+            process, inbox = self._workers[old_owner]
+            states = None
+            if process.is_alive():
+                # The release is queued behind the old owner's pending tasks for
+                # these sites, so state is exported only after they have run.
+                inbox.put(('release', [site_id for site_id, _ in sites]))
+                states = self._await_release(old_owner, process)
+            if states is None:
+                # Old owner died: its queued tasks are lost with it
+                self._resubmit([site_id for site_id, _ in sites])
+                continue
+            for site_id, new_owner in sites:
+                self._workers[new_owner][1].put(('adopt', site_id, states.get(site_id)))
+
+    def _await_release(self, worker_id, process):
+        """Wait for a worker's handoff; None if it died before replying"""
+        deadline = time.monotonic() + self.handoff_timeout
+        while worker_id not in self._released:
+            if not process.is_alive():
+                self.poll()
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Worker {worker_id} did not hand off its sites")
+            self._receive(min(remaining, 0.5))
+        return self._released.pop(worker_id, None)
+
+    # Task routing
+
+    def submit(self, site_id, name, payload=None):
+        """Queue a task on the worker that owns `site_id`"""
+        owner = self.ring.owner(site_id)
+        if owner is None:
+            raise RuntimeError("No site workers are running")
+        seq = self._seq.get(site_id, 0) + 1
+        self._seq[site_id] = seq
+        self._pending.setdefault(site_id, deque()).append((seq, time.time(), name, payload))
+        self._workers[owner][1].put(('task', site_id, seq, name, payload))
+        return seq
+
+    def schedule_periodic(self, site_ids, name, payload=None):
+        """Submit one task per site (e.g. every COMPLIANCE_CHECK_INTERVAL seconds)
+
+        Sites that still have an unfinished `name` task are skipped, so a
+        handler slower than its interval cannot grow the backlog without
+        bound. Returns {site_id: seq} for the tasks actually submitted.
+        """
+        self.poll()
+        busy = {
+            site_id for site_id, pending in self._pending.items()
+            if any(task[2] == name for task in pending)
+        }
+        return {
+            site_id: self.submit(site_id, name, payload)
+            for site_id in site_ids if site_id not in busy
+        }
+
+    def poll(self):
+        """Drain worker reports without blocking"""
+        while self._receive(0):
+            pass
+
+    def _receive(self, timeout):
+        """Handle messages from every worker pipe that is ready; False if none were"""
+        if not self._readers:
+            if timeout:
+                time.sleep(timeout)
+            return False
+        ready = wait(list(self._readers), timeout)
+        for reader in ready:
+            try:
+                message = reader.recv()
+            except (EOFError, OSError):
+                # Worker exited; its pipe is drained
+                self._readers.pop(reader, None)
+                reader.close()
+                continue
+            self._handle(message)
+        return bool(ready)
+
+    def _handle(self, message):
+        kind, worker_id = message[0], message[1]
+        if kind == 'progress':
+            for site_id, seq in message[2].items():
+                pending = self._pending.get(site_id)
+                while pending and pending[0][0] <= seq:
+                    pending.popleft()
+            self.errors.extend(message[3])
+        elif kind == 'released':
+            self._released[worker_id] = message[2]
+
+    # Observability
+
+    def lag(self):
+        """Per-site lag: age of the oldest unfinished task and queue depth"""
+        self.reap_dead_workers()
+        self.poll()
+        now = time.time()
+        return {
+            site_id: {
+                'owner': self.ring.owner(site_id),
+                'pending': len(pending),
+                'lag_seconds': now - pending[0][1] if pending else 0.0,
+            }
+            for site_id, pending in self._pending.items()
+        }
+
+    def wait_idle(self, timeout=30.0):
+        """Block until every submitted task has been reported done"""
+        deadline = time.monotonic() + timeout
+        while any(self._pending.values()):
+            if time.monotonic() > deadline:
+                return False
+            self.reap_dead_workers()
+            self._receive(0.05)
+        return True
+
+    def shutdown(self):
+        """Stop all workers, returning their final per-site state"""
+        states = {}
+        for worker_id in list(self._workers):
+            process, inbox = self._workers.pop(worker_id)
+            self.ring.remove(worker_id)
+            inbox.put(('stop',))
+            states.update(self._await_release(worker_id, process) or {})
+            process.join(self.handoff_timeout)
+        return states
@@ -0,0 +1,79 @@
+"""
+Per-site tasks run by the site scheduler
+Handlers take (site_id, state, payload) and keep caches in `state`, which
+stays resident on the worker that owns the site
+"""
+
+import time
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+# Zone definitions change rarely; reload them at most this often (seconds)
+ZONE_CACHE_TTL = 300
+
+
+def new_site_state(site_id):
+    return {'site_id': site_id, 'zones': None, 'zones_loaded_at': 0.0, 'checks': 0, 'heatmap': None}
+
+
+def _zones(state):
+    """Resident zone index for the site, refreshed every ZONE_CACHE_TTL seconds"""
+    from apps.monitoring.models import Zone
+
+    if state['zones'] is None or time.monotonic() - state['zones_loaded_at'] > ZONE_CACHE_TTL:
+        state['zones'] = {
+            zone.pk: zone for zone in Zone.objects.filter(site_id=state['site_id'], is_active=True)
+        }
+        state['zones_loaded_at'] = time.monotonic()
+    return state['zones']
+
+
+def compliance_check(site_id, state, payload):
+    """Periodic check: raise a zone_overcrowding alert for zones over max_occupancy"""
+    from django.db.models import Count
+    from apps.alerts.models import Alert
+    from apps.monitoring.models import Worker
+
+    close_old_connections()
+    try:
+        zones = _zones(state)
+        occupancy = dict(
+            Worker.objects.filter(site_id=site_id, is_on_site=True, current_zone__in=list(zones))
+            .values_list('current_zone').annotate(total=Count('pk'))
+        )
+        open_alerts = set(
+            Alert.objects.filter(site_id=site_id, alert_type='zone_overcrowding',
+                                 status__in=['active', 'acknowledged'])
+            .values_list('zone_id', flat=True)
+        )
+        for zone_id, count in occupancy.items():
+            zone = zones[zone_id]
+            if count > zone.max_occupancy and zone_id not in open_alerts:
+                Alert.objects.create(
+                    site_id=site_id,
+                    zone=zone,
+                    alert_type='zone_overcrowding',
+                    severity='high' if zone.safety_level in ('high', 'critical') else 'medium',
+                    title=f"Zone overcrowded: {zone.name}",
+                    description=f"{count} workers in zone (max {zone.max_occupancy}) at {timezone.now():%H:%M:%S}",
+                )
+        state['checks'] += 1
+    finally:
+        close_old_connections()
+
+
+def heatmap_update(site_id, state, payload):
+    """Periodic task: fold queued position samples into the site's tiles and publish
+
+    The worker that owns the site is the only process aggregating or
+    writing its tiles, so a published tile holds every drained sample.
+    """
+    from apps.monitoring.heatmaps import HeatmapAggregator, drain_points, heatmap_config
+
+    if state.get('heatmap') is None:
+        state['heatmap'] = HeatmapAggregator(heatmap_config())
+    aggregator = state['heatmap']
+    # Anything beyond DRAIN_BATCH payloads waits for the next run
+    aggregator.add_samples(site_id, drain_points(site_id, aggregator.config['DRAIN_BATCH']))
+    aggregator.publish()
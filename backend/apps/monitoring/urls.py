@@ -0,0 +1,11 @@
+from django.urls import path
+
+from apps.monitoring import views
+
+urlpatterns = [
+    path(
+        'sites/<int:site_id>/heatmap/<str:layer>/<int:z>/<int:x>/<int:y>.<str:fmt>',
+        views.heatmap_tile,
+        name='heatmap-tile',
+    ),
+]
@@ -0,0 +1,42 @@
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from rest_framework.decorators import api_view
+
+from apps.monitoring.heatmaps import (
+    FORMATS, LAYERS, cached_tile, cached_tile_etag, time_bucket,
+)
+
+
+@api_view(['GET'])
+def heatmap_tile(request, site_id, layer, z, x, y, fmt):
+    """Serve a published heatmap tile straight from the cache
+
+    `?bucket=` selects the time bucket (defaults to the current one).
+    Tile (0, 0) at every level starts at the aggregator's origin_offset
+    (ORIGIN_OFFSET rounded up to whole level-0 tiles) below and left of the
+    site origin. Tiles are published by the site scheduler's heatmap_update
+    task; a missing tile is empty and returned as 204.
+    """
+    if layer not in LAYERS or fmt not in FORMATS:
+        raise Http404
+    bucket = request.query_params.get('bucket')
+    if bucket is None:
+        bucket = time_bucket(timezone.now())
+    else:
+        try:
+            bucket = int(bucket)
+        except ValueError:
+            raise Http404
+
+    etag = cached_tile_etag(site_id, bucket, layer, z, x, y, fmt)
+    if etag is not None and etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        entry = cached_tile(site_id, bucket, layer, z, x, y, fmt)
+        if entry is None:
+            return HttpResponse(status=204)
+        etag, body = entry
+        response = HttpResponse(body, content_type=FORMATS[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
@@ -0,0 +1,63 @@
+"""
+Per-tick latency benchmark for predictive fall-risk scoring
+
+Usage (from backend/):
+    python -m benchmarks.bench_fall_prediction --workers 1000 --ticks 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from apps.detection.fall_prediction import EDGE_TYPES, FallRiskPredictor
+
+
+def make_site(rng, edges, size):
+    """Random edge segments inside a square site of `size` meters"""
+    start = rng.uniform(0, size, (edges, 2))
+    end = start + rng.uniform(-20, 20, (edges, 2))
+    types = [EDGE_TYPES[i % len(EDGE_TYPES)] for i in range(edges)]
+    return np.hstack([start, end]), types
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=1000)
+    parser.add_argument('--edges', type=int, default=40)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--history', type=int, default=16)
+    parser.add_argument('--hz', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    size = 200.0
+    edges, types = make_site(rng, args.edges, size)
+    predictor = FallRiskPredictor(edges, types, history=args.history)
+
+    worker_ids = list(range(args.workers))
+    positions = rng.uniform(0, size, (args.workers, 2))
+    velocity = rng.normal(0, 1.0, (args.workers, 2))
+    has_harness = rng.random(args.workers) > 0.2
+    harness_attached = has_harness & (rng.random(args.workers) > 0.1)
+    has_hardhat = rng.random(args.workers) > 0.05
+
+    dt = 1.0 / args.hz
+    latencies = []
+    for tick in range(args.ticks):
+        positions += velocity * dt + rng.normal(0, 0.05, positions.shape)
+        start = time.perf_counter()
+        result = predictor.tick(worker_ids, positions, tick * dt,
+                                has_harness, harness_attached, has_hardhat)
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies[args.history:] or latencies) * 1000
+    print(f"workers={args.workers} edges={args.edges} history={args.history} ticks={args.ticks}")
+    print(f"per-tick ms: mean={latencies.mean():.3f} p50={np.percentile(latencies, 50):.3f} "
+          f"p99={np.percentile(latencies, 99):.3f} max={latencies.max():.3f}")
+    print(f"workers at risk (>=40): {(result['risk_score'] >= 40).sum()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Startup time and memory benchmark per process role
+
+Each role is measured in a fresh interpreter: settings import, the role's
+provider warm-up (what run_ml_worker does before serving jobs), then
+django.setup() and URLconf loading. The provider figures do not depend on
+the app registry; if setup or the URLconf fails, the error is reported
+next to the numbers instead of aborting the run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --roles api inference analysis
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ('torch', 'torchvision', 'transformers', 'langchain', 'openai', 'cv2')
+
+PROBE = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+from django.conf import settings
+settings.INSTALLED_APPS
+settings_s = time.perf_counter() - start
+from apps.ml import providers
+loaded = providers.warm_up()
+providers_s = time.perf_counter() - start
+setup_error = None
+try:
+    import django
+    django.setup()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+except Exception as exc:
+    setup_error = f'{type(exc).__name__}: {exc}'
+total = time.perf_counter() - start
+heavy = sorted(m for m in %r if m in sys.modules)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024
+print(json.dumps({
+    'settings_s': settings_s,
+    'providers_s': providers_s,
+    'total_s': total,
+    'max_rss_mb': rss / 1024,
+    'providers': loaded,
+    'heavy_modules': heavy,
+    'setup_error': setup_error,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(role):
+    env = dict(os.environ, PROCESS_ROLE=role)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'siteye_backend.settings')
+    result = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"{role} probe failed (exit {result.returncode}):", file=sys.stderr)
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--roles', nargs='+', default=['api', 'inference', 'analysis'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    failed = False
+    for role in args.roles:
+        runs = [measure(role) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['total_s'])
+        print(f"{role:<10} settings={best['settings_s']:.3f}s providers={best['providers_s']:.3f}s "
+              f"total={best['total_s']:.3f}s rss={best['max_rss_mb']:.1f}MB "
+              f"providers={best['providers']} heavy={best['heavy_modules']}")
+        if best['setup_error']:
+            print(f"{'':<10} django setup/URLconf failed: {best['setup_error']}", file=sys.stderr)
+        # Heavy modules must stay out of the API role, whatever the URLconf pulls in
+        if role == 'api' and best['heavy_modules']:
+            failed = True
+    if failed:
+        print("api role imported heavy ML modules", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
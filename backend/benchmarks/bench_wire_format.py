@@ -0,0 +1,174 @@
+"""
+Parse-cost benchmark: binary detection batches vs the JSON upload path
+
+`parse` stops at the decoded columns; `build` runs on to the unsaved
+Detection objects that bulk_create receives (wire.to_detections vs
+json.loads plus the same constructor calls), which is what bulk_ingest
+actually pays before touching the database.
+
+With --db the insert itself is timed against the configured database, with
+and without the follow-up UPDATE that writes edge capture times; every
+batch is rolled back. It needs at least one Camera row.
+
+Usage (from backend/):
+    python -m benchmarks.bench_wire_format --records 1000 --repeat 200
+    python -m benchmarks.bench_wire_format --records 1000 --repeat 20 --db
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'siteye_backend.settings')
+import django
+django.setup()
+
+from apps.detection import wire
+from apps.detection.models import Detection
+
+
+CLASSES = ('person', 'hard_hat', 'safety_vest', 'crane', 'excavator', 'safety_harness', 'gloves')
+
+
+def make_detections(count, rng):
+    detections = []
+    for i in range(count):
+        detections.append({
+            'timestamp': 1_700_000_000 + i / 30,
+            'camera_id': int(rng.integers(1, 32)),
+            'worker_id': int(rng.integers(1, 500)) if rng.random() > 0.3 else None,
+            'zone_id': int(rng.integers(1, 40)) if rng.random() > 0.5 else None,
+            'detection_type': wire.DETECTION_TYPES[int(rng.integers(0, len(wire.DETECTION_TYPES)))],
+            'object_class': CLASSES[int(rng.integers(0, len(CLASSES)))],
+            'confidence': float(rng.random()),
+            'bounding_box': {
+                'x': float(rng.uniform(0, 1920)), 'y': float(rng.uniform(0, 1080)),
+                'width': float(rng.uniform(10, 300)), 'height': float(rng.uniform(10, 300)),
+            },
+            'worker_position': {'x': float(rng.uniform(0, 200)), 'y': float(rng.uniform(0, 200))}
+            if rng.random() > 0.5 else None,
+        })
+    return detections
+
+
+def parse_json(payload):
+    rows = json.loads(payload)
+    camera_ids = [row['camera_id'] for row in rows]
+    classes = [row['object_class'] for row in rows]
+    confidences = [row['confidence'] for row in rows]
+    boxes = [(b['x'], b['y'], b['width'], b['height']) for b in (row['bounding_box'] for row in rows)]
+    positions = [row['worker_position'] for row in rows]
+    return camera_ids, classes, confidences, boxes, positions
+
+
+def build_json(payload):
+    return [
+        Detection(
+            camera_id=row['camera_id'],
+            detection_type=row['detection_type'],
+            object_class=row['object_class'],
+            confidence=row['confidence'],
+            bounding_box=row['bounding_box'],
+            worker_id=row['worker_id'],
+            zone_id=row['zone_id'],
+        )
+        for row in json.loads(payload)
+    ]
+
+
+def build_binary(payload):
+    return wire.to_detections(wire.decode(payload))
+
+
+def parse_binary(payload):
+    batch = wire.decode(payload)
+    records = batch.records
+    return (records['camera_id'], batch.class_names(), records['confidence'],
+            records['bbox'], records['position'])
+
+
+def timeit(fn, payload, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class _Rollback(Exception):
+    pass
+
+
+def time_insert(payload, repeat, capture_times):
+    """Best time for validate + bulk_create (+ capture-time UPDATE), rolled back"""
+    from django.db import transaction
+
+    best = float('inf')
+    for _ in range(repeat):
+        batch = wire.decode(payload)
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                wire.validate_references(batch)
+                created = Detection.objects.bulk_create(wire.to_detections(batch), batch_size=1000)
+                if capture_times:
+                    wire._write_capture_times(created, batch.records['timestamp'])
+                best = min(best, time.perf_counter() - start)
+                raise _Rollback
+        except _Rollback:
+            pass
+    return best
+
+
+def bench_database(detections, repeat):
+    from apps.monitoring.models import Camera
+
+    camera_ids = list(Camera.objects.values_list('pk', flat=True)[:32])
+    if not camera_ids:
+        raise SystemExit("--db needs at least one Camera row")
+    for i, detection in enumerate(detections):
+        # Only cameras are known to exist; leave the optional references empty
+        detection.update(camera_id=camera_ids[i % len(camera_ids)], worker_id=None, zone_id=None)
+    payload = wire.encode(detections)
+
+    insert = time_insert(payload, repeat, capture_times=False)
+    ingest = time_insert(payload, repeat, capture_times=True)
+    print(f"db insert={insert * 1e3:>8.2f}ms  insert+capture-time update={ingest * 1e3:>8.2f}ms  "
+          f"update overhead={(ingest / insert - 1) * 100:>5.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--db', action='store_true', help="also time inserts against the database")
+    args = parser.parse_args()
+
+    detections = make_detections(args.records, np.random.default_rng(0))
+    payloads = {
+        'json': json.dumps(detections).encode(),
+        'binary': wire.encode(detections),
+        'binary+zlib': wire.encode(detections, compress=True),
+    }
+    parsers = {'json': parse_json, 'binary': parse_binary, 'binary+zlib': parse_binary}
+    builders = {'json': build_json, 'binary': build_binary, 'binary+zlib': build_binary}
+
+    baseline = None
+    print(f"{args.records} records per batch")
+    for name, payload in payloads.items():
+        parse = timeit(parsers[name], payload, args.repeat)
+        build = timeit(builders[name], payload, args.repeat)
+        baseline = baseline or build
+        print(f"{name:<12} size={len(payload):>8}B  parse={parse * 1e6:>9.1f}us  "
+              f"build={build * 1e6:>9.1f}us  per-record={build / args.records * 1e9:>7.1f}ns  "
+              f"speedup={baseline / build:>5.1f}x")
+    if args.db:
+        bench_database(detections, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -45,6 +45,7 @@ LOCAL_APPS = [
     'apps.detection',
     'apps.compliance',
     'apps.alerts',
+    'apps.ml',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -177,6 +178,27 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
 PINECONE_ENVIRONMENT = os.getenv('PINECONE_ENVIRONMENT')
 
+# Process roles: 'api' workers never import ML backends, 'inference' runs
+# object detection and 'analysis' runs LLM compliance analysis
+PROCESS_ROLE = os.getenv('PROCESS_ROLE', 'api')
+
+ML_PROVIDERS = {
+    'detector': {
+        'CLASS': 'apps.ml.detectors.GroundingDinoDetector',
+        'OPTIONS': {'model_id': os.getenv('DETECTOR_MODEL_ID', 'IDEA-Research/grounding-dino-tiny')},
+    },
+    'compliance_analyzer': {
+        'CLASS': 'apps.ml.analysis.OpenAIComplianceAnalyzer',
+        'OPTIONS': {'model': os.getenv('COMPLIANCE_LLM_MODEL', 'gpt-4o-mini')},
+    },
+}
+
+PROCESS_ROLES = {
+    'api': {'PROVIDERS': [], 'PRELOAD': []},
+    'inference': {'PROVIDERS': ['detector'], 'PRELOAD': ['detector']},
+    'analysis': {'PROVIDERS': ['compliance_analyzer'], 'PRELOAD': ['compliance_analyzer']},
+}
+
 # Safety Configuration
 SAFETY_CONFIG = {
     'MAX_ALERTS_PER_MINUTE': int(os.getenv('MAX_ALERTS_PER_MINUTE', 10)),
@@ -184,6 +206,44 @@ SAFETY_CONFIG = {
     'EMERGENCY_CONTACT': os.getenv('EMERGENCY_CONTACT', '+1-555-SAFETY'),
 }
 
+# Site-sharded scheduler (manage.py run_site_scheduler)
+SITE_SCHEDULER = {
+    'WORKERS': int(os.getenv('SITE_SCHEDULER_WORKERS', 4)),
+    'METRICS_PORT': int(os.getenv('SITE_SCHEDULER_METRICS_PORT', 9108)),
+    'STATE_FACTORY': 'apps.monitoring.site_tasks.new_site_state',
+    'HANDLERS': {
+        'compliance_check': 'apps.monitoring.site_tasks.compliance_check',
+        'heatmap_update': 'apps.monitoring.site_tasks.heatmap_update',
+    },
+    # task name -> interval (seconds)
+    'PERIODIC_TASKS': {
+        'compliance_check': SAFETY_CONFIG['COMPLIANCE_CHECK_INTERVAL'],
+        'heatmap_update': int(os.getenv('HEATMAP_UPDATE_INTERVAL', 5)),
+    },
+}
+
+# Heatmap tiles (site-local meters; level 0 is the coarsest)
+HEATMAP_CONFIG = {
+    'CELL_SIZE': 0.5,
+    'MAX_LEVEL': 6,
+    'TILE_CELLS': 64,
+    'BUCKET_SECONDS': int(os.getenv('HEATMAP_BUCKET_SECONDS', 3600)),
+    'RETAIN_BUCKETS': 2,
+    'ORIGIN_OFFSET': 10000.0,
+    'DENSITY_SATURATION': 2.0,
+    'FORMATS': ('png', 'json'),
+}
+
+# Detection snapshot storage (stored under MEDIA_ROOT/snapshots)
+SNAPSHOT_CONFIG = {
+    'WORKERS': int(os.getenv('SNAPSHOT_WORKERS', 4)),
+    'JPEG_QUALITY': int(os.getenv('SNAPSHOT_JPEG_QUALITY', 85)),
+    'THUMBNAIL_SIZE': (160, 160),
+    'DEDUP_DISTANCE': int(os.getenv('SNAPSHOT_DEDUP_DISTANCE', 4)),
+    'FSYNC_BATCH': int(os.getenv('SNAPSHOT_FSYNC_BATCH', 64)),
+    'FSYNC_INTERVAL': float(os.getenv('SNAPSHOT_FSYNC_INTERVAL', 1.0)),
+}
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -0,0 +1,37 @@
+"""
+Shared fixtures for backend tests
+Model imports stay inside fixtures so the pure NumPy tests import nothing
+from Django
+"""
+
+import pytest
+
+
+@pytest.fixture
+def memory_cache():
+    """Process-local cache standing in for the shared Redis cache"""
+    from django.core.cache.backends.locmem import LocMemCache
+
+    cache = LocMemCache('siteye-tests', {})
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def site(db):
+    from django.contrib.gis.geos import Point
+    from apps.monitoring.models import Site
+
+    return Site.objects.create(name='Test Site', location=Point(0.0, 0.0))
+
+
+@pytest.fixture
+def make_alert(site):
+    from apps.alerts.models import Alert
+
+    def make(severity='high', status='active', **fields):
+        return Alert.objects.create(
+            site=site, alert_type='ppe_violation', severity=severity, status=status,
+            title='Missing hard hat', description='Worker without hard hat', **fields
+        )
+    return make
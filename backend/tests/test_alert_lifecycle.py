@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+import pytest
+
+from apps.alerts.services import AlertLifecycleService, InvalidTransition
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def service(memory_cache):
+    return AlertLifecycleService(cache_backend=memory_cache)
+
+
+def _reload(alert):
+    alert.refresh_from_db()
+    return alert
+
+
+def test_acknowledge_then_resolve_records_both_metrics(service, make_alert, django_capture_on_commit_callbacks):
+    alert = make_alert()
+    with django_capture_on_commit_callbacks(execute=True):
+        service.acknowledge(alert, at=alert.created_at + timedelta(seconds=30))
+    with django_capture_on_commit_callbacks(execute=True):
+        service.resolve(alert, notes='Fixed', at=alert.created_at + timedelta(seconds=90))
+
+    alert = _reload(alert)
+    assert alert.status == 'resolved'
+    assert alert.response_time == timedelta(seconds=30)
+    assert alert.resolution_notes == 'Fixed'
+    assert service.get_stats(alert.site_id, 'high')['p50'] == pytest.approx(30)
+    resolution = service.get_stats(alert.site_id, 'high', metric=service.RESOLUTION)
+    assert resolution['count'] == 1 and resolution['p50'] == pytest.approx(90)
+
+
+def test_resolving_unacknowledged_alert_counts_as_response(service, make_alert, django_capture_on_commit_callbacks):
+    alert = make_alert()
+    with django_capture_on_commit_callbacks(execute=True):
+        service.mark_false_positive(alert, at=alert.created_at + timedelta(seconds=45))
+
+    alert = _reload(alert)
+    assert alert.status == 'false_positive'
+    assert alert.acknowledged_at is not None
+    assert service.get_stats(alert.site_id, 'high')['count'] == 1
+    assert service.get_stats(alert.site_id, 'high', metric=service.RESOLUTION)['count'] == 0
+
+
+@pytest.mark.parametrize('status, action', [
+    ('acknowledged', 'acknowledge'),
+    ('resolved', 'acknowledge'),
+    ('resolved', 'resolve'),
+    ('false_positive', 'resolve'),
+    ('resolved', 'mark_false_positive'),
+])
+def test_illegal_transitions_raise(service, make_alert, status, action):
+    alert = make_alert(status=status)
+    with pytest.raises(InvalidTransition):
+        getattr(service, action)(alert)
+    assert _reload(alert).status == status
+
+
+def test_concurrent_acknowledge_records_once(service, make_alert, django_capture_on_commit_callbacks):
+    alert = make_alert()
+    stale = type(alert).objects.get(pk=alert.pk)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        service.acknowledge(alert)
+        with pytest.raises(InvalidTransition):
+            service.acknowledge(stale)
+    assert len(callbacks) == 1
+    assert service.get_stats(alert.site_id, 'high')['count'] == 1
+
+
+def test_stale_acknowledge_cannot_reopen_resolved_alert(service, make_alert):
+    alert = make_alert()
+    stale = type(alert).objects.get(pk=alert.pk)
+    service.resolve(alert)
+    with pytest.raises(InvalidTransition):
+        service.acknowledge(stale)
+    assert _reload(alert).status == 'resolved'
+
+
+def test_bulk_acknowledge_counts_and_samples(service, make_alert, django_capture_on_commit_callbacks):
+    active = [make_alert(severity='high'), make_alert(severity='high'), make_alert(severity='low')]
+    resolved = make_alert(status='resolved')
+    now = max(alert.created_at for alert in active) + timedelta(seconds=60)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        count = service.bulk_acknowledge([alert.pk for alert in active] + [resolved.pk], at=now)
+
+    assert count == 3
+    assert {_reload(alert).status for alert in active} == {'acknowledged'}
+    assert _reload(resolved).status == 'resolved'
+    site_id = active[0].site_id
+    assert service.get_stats(site_id, 'high')['count'] == 2
+    assert service.get_stats(site_id, 'low')['count'] == 1
+    assert service.get_stats(site_id, 'low')['p50'] == pytest.approx(
+        (now - active[2].created_at).total_seconds()
+    )
+    # A second pass finds nothing left to acknowledge
+    assert service.bulk_acknowledge([alert.pk for alert in active], at=now) == 0
+    assert service.bulk_acknowledge([]) == 0
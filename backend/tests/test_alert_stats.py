@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from apps.alerts.stats import StreamingStats, TDigest
+
+
+@pytest.mark.parametrize('distribution', ['uniform', 'exponential', 'lognormal'])
+def test_tdigest_quantiles_match_numpy(distribution):
+    rng = np.random.default_rng(7)
+    samples = {
+        'uniform': lambda: rng.uniform(0, 600, 50_000),
+        'exponential': lambda: rng.exponential(120, 50_000),
+        'lognormal': lambda: rng.lognormal(4, 1, 50_000),
+    }[distribution]()
+    digest = TDigest(compression=100)
+    for value in samples:
+        digest.add(float(value))
+
+    assert len(digest) == len(samples)
+    ordered = np.sort(samples)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.95, 0.99):
+        estimate = digest.quantile(q)
+        assert estimate == pytest.approx(np.percentile(samples, q * 100), rel=0.02)
+        # Rank error stays small in the tails where values are sparse
+        rank = np.searchsorted(ordered, estimate) / len(samples)
+        assert abs(rank - q) < 0.005, (q, rank)
+    assert digest.quantile(0) == samples.min()
+    assert digest.quantile(1) == samples.max()
+
+
+def test_tdigest_small_and_empty():
+    digest = TDigest()
+    assert digest.quantile(0.5) is None
+    for value in (1.0, 2.0, 3.0):
+        digest.add(value)
+    assert digest.quantile(0.5) == pytest.approx(2.0)
+
+
+def test_streaming_stats_summary_and_cache():
+    stats = StreamingStats()
+    values = np.arange(1, 1001, dtype=float)
+    for value in values:
+        stats.add(value)
+
+    summary = stats.as_dict()
+    assert summary['count'] == 1000
+    assert summary['mean'] == pytest.approx(values.mean())
+    assert (summary['min'], summary['max']) == (1.0, 1000.0)
+    assert summary['p50'] == pytest.approx(np.percentile(values, 50), rel=0.01)
+    assert stats.percentile(0.9) == summary['p90']
+
+    stats.add(5000.0)
+    assert stats.percentile(0.99) > summary['p99']
+
+
+def test_streaming_stats_empty_summary():
+    assert StreamingStats().as_dict() == {'count': 0, 'mean': None, 'min': None, 'max': None}
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from apps.detection.fall_prediction import (
+    FallRiskPredictor, TrajectoryBuffer, annotate_fall_detections, effective_distance,
+)
+
+
+# Edge A runs along y=0; edge B is the line x=15
+EDGES = [(-100.0, 0.0, 100.0, 0.0), (15.0, -100.0, 15.0, 100.0)]
+EDGE_TYPES = ['platform_edge', 'roof_edge']
+
+
+def _walk(predictor, worker_id='w1', start=(0.0, 1.5), velocity=(1.9, 0.0), steps=8, dt=0.25,
+          harness=(True, True), hardhat=True):
+    """Feed a straight-line walk one sample per tick; returns the last result and time"""
+    for step in range(steps):
+        t = step * dt
+        position = (start[0] + velocity[0] * t, start[1] + velocity[1] * t)
+        result = predictor.tick([worker_id], [position], t, [harness[0]], [harness[1]], [hardhat])
+    return result, t, position
+
+
+def test_effective_distance_scalar_and_array():
+    assert effective_distance(2.0, None) == 2.0
+    assert effective_distance(2.0, 6.0, horizon=3.0) == pytest.approx(1.0)
+    assert effective_distance(2.0, 1.0, horizon=3.0) == 0.0
+    projected = effective_distance(np.array([2.0, 2.0]), np.array([np.inf, 6.0]), horizon=3.0)
+    assert projected.tolist() == pytest.approx([2.0, 1.0])
+
+
+def test_velocity_is_least_squares_over_history():
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES)
+    result, _, _ = _walk(predictor, start=(-20.0, 10.0), velocity=(0.5, -1.0))
+    assert result['velocity'][0] == pytest.approx([0.5, -1.0], abs=1e-4)
+
+
+def test_time_to_edge_belongs_to_governing_edge():
+    # 1.5 m from edge A walking parallel to it; closing on edge B (~15 m) at 1.9 m/s
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES)
+    result, _, position = _walk(predictor)
+
+    assert result['edge_index'][0] == 0
+    assert result['distance_to_edge'][0] == pytest.approx(1.5)
+    assert np.isinf(result['time_to_edge'][0])
+    assert result['predicted_distance'][0] == pytest.approx(1.5)
+    # 25 distance points, platform_edge multiplier
+    assert result['risk_score'][0] == pytest.approx(25 * 1.1)
+
+
+def test_closing_worker_is_scored_on_projected_distance():
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES)
+    result, _, position = _walk(predictor, start=(8.0, 50.0), velocity=(1.0, 0.0), steps=12)
+
+    assert result['edge_index'][0] == 1
+    distance = 15.0 - position[0]
+    assert result['distance_to_edge'][0] == pytest.approx(distance, abs=1e-4)
+    assert result['time_to_edge'][0] == pytest.approx(distance / 1.0, rel=1e-3)
+    assert result['predicted_distance'][0] < distance
+
+
+def test_duplicate_worker_ids_rejected():
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES)
+    with pytest.raises(ValueError):
+        predictor.tick(['w1', 'w1'], [(0, 5), (1, 5)], 0.0, [True] * 2, [True] * 2, [True] * 2)
+
+
+def test_idle_workers_are_evicted_and_slots_reused():
+    buffer = TrajectoryBuffer(history=4, capacity=2)
+    buffer.append(['a', 'b'], 0.0, [(0, 0), (1, 1)])
+    buffer.append(['a'], 50.0, [(0, 1)])
+    assert buffer.evict_idle(now=70.0, max_idle=30.0) == ['b']
+    assert len(buffer) == 1
+    slots = buffer.append(['c', 'd'], 71.0, [(2, 2), (3, 3)])
+    assert len(set(slots.tolist())) == 2
+    assert buffer.counts[slots].tolist() == [1, 1]
+
+
+def test_predictor_evicts_during_tick():
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES, max_idle=10.0)
+    predictor.tick(['a', 'b'], [(0, 5), (1, 5)], 0.0, [True] * 2, [True] * 2, [True] * 2)
+    predictor.tick(['a'], [(0, 5)], 20.0, [True], [True], [True])
+    assert set(predictor.buffer.slots) == {'a'}
+
+
+def test_no_edges_scores_equipment_only():
+    predictor = FallRiskPredictor([], [])
+    result = predictor.tick(['w1'], [(0, 0)], 0.0, [False], [False], [False])
+    assert result['risk_score'][0] == 40
+    assert np.isinf(result['distance_to_edge'][0])
+
+
+@pytest.mark.parametrize('start, velocity, harness, hardhat', [
+    ((0.0, 1.5), (1.9, 0.0), (True, True), True),      # parallel to A, closing on B
+    ((8.0, 50.0), (1.0, 0.0), (True, False), True),    # closing on B
+    ((-30.0, 4.0), (0.0, -0.8), (False, False), False),  # closing on A
+    ((-30.0, 2.5), (2.5, 0.0), (True, True), False),   # fast movement
+])
+def test_vector_score_matches_model_score(start, velocity, harness, hardhat):
+    from apps.detection.fall_detection import FallDetection
+
+    walk = dict(worker_id=1, start=start, velocity=velocity, steps=7, harness=harness, hardhat=hardhat)
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES)
+    _walk(predictor, **walk)
+    t = 7 * 0.25
+    position = (start[0] + velocity[0] * t, start[1] + velocity[1] * t)
+    expected = predictor.tick([1], [position], t, [harness[0]], [harness[1]], [hardhat])
+
+    # A fresh predictor with the same history stands in for the live one
+    predictor = FallRiskPredictor(EDGES, EDGE_TYPES)
+    _walk(predictor, **walk)
+    row = FallDetection(
+        worker_id=1, worker_position={'x': position[0], 'y': position[1]},
+        distance_to_edge=99.0, edge_type='building_edge',
+        has_harness=harness[0], harness_attached=harness[1], has_hardhat=hardhat,
+    )
+    annotate_fall_detections(predictor, [row], t)
+
+    assert row.edge_type == EDGE_TYPES[expected['edge_index'][0]]
+    assert row.calculate_risk_score() == pytest.approx(expected['risk_score'][0])
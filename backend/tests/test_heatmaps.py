@@ -0,0 +1,124 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from apps.monitoring import heatmaps
+from apps.monitoring.heatmaps import HeatmapAggregator, encode_tile
+
+
+CONFIG = {
+    'CELL_SIZE': 0.5,
+    'MAX_LEVEL': 3,
+    'TILE_CELLS': 16,
+    'ORIGIN_OFFSET': 100.0,
+    'BUCKET_SECONDS': 3600,
+    'RETAIN_BUCKETS': 2,
+    'DENSITY_SATURATION': 2.0,
+    'FORMATS': ('json', 'png'),
+    'CACHE_TIMEOUT': 60,
+    'DRAIN_BATCH': 100,
+}
+HOUR = 3600.0
+T0 = 1_700_000_000 // 3600 * 3600.0
+
+
+def _samples(t, points):
+    return np.array([(t, x, y, risk) for x, y, risk in points], dtype=np.float64)
+
+
+@pytest.fixture
+def aggregator(memory_cache, monkeypatch):
+    monkeypatch.setattr(heatmaps, 'cache', memory_cache)
+    return HeatmapAggregator(dict(CONFIG))
+
+
+def _finest(aggregator, site_id, t, x, y):
+    z = aggregator.max_level
+    cell = aggregator.cell_sizes[z]
+    gx = int((x + aggregator.origin_offset) // cell)
+    gy = int((y + aggregator.origin_offset) // cell)
+    tile = aggregator.get_tile(site_id, int(t // HOUR), z, gx // aggregator.cells, gy // aggregator.cells)
+    return tile, gy % aggregator.cells, gx % aggregator.cells
+
+
+def test_origin_offset_is_whole_level_zero_tiles(aggregator):
+    span = aggregator.cell_sizes[0] * aggregator.cells
+    assert aggregator.origin_offset >= CONFIG['ORIGIN_OFFSET']
+    assert aggregator.origin_offset % span == 0
+
+
+def test_negative_coordinates_map_to_non_negative_tiles(aggregator):
+    aggregator.add_samples(1, _samples(T0, [(-5.0, -3.0, np.nan), (2.0, 1.0, np.nan)]))
+    keys = aggregator._tiles[(1, int(T0 // HOUR))]
+    assert keys and all(x >= 0 and y >= 0 for _, x, y in keys)
+    # Further out than the offset is dropped rather than wrapped
+    aggregator.add_samples(1, _samples(T0, [(-1e6, 0.0, np.nan)]))
+    assert sum(tile.count.sum() for tile in keys.values()) == 2 * (aggregator.max_level + 1)
+
+
+def test_every_level_counts_each_sample_once(aggregator):
+    rng = np.random.default_rng(0)
+    points = [(x, y, np.nan) for x, y in rng.uniform(-50, 50, (200, 2))]
+    aggregator.add_samples(1, _samples(T0, points))
+    tiles = aggregator._tiles[(1, int(T0 // HOUR))]
+    for z in range(aggregator.max_level + 1):
+        assert sum(tile.count.sum() for key, tile in tiles.items() if key[0] == z) == 200
+
+
+def test_risk_mean_ignores_samples_without_risk(aggregator):
+    aggregator.add_samples(1, _samples(T0, [(1.1, 1.1, 80.0), (1.2, 1.2, np.nan), (1.3, 1.3, 40.0)]))
+    tile, row, col = _finest(aggregator, 1, T0, 1.1, 1.1)
+    assert tile.count[row, col] == 3
+    assert tile.layer('risk')[row, col] == pytest.approx(60.0)
+    assert tile.risk_max[row, col] == 80.0
+
+
+def test_only_recent_buckets_are_kept(aggregator):
+    for hour in range(4):
+        aggregator.add_samples(1, _samples(T0 + hour * HOUR, [(0.0, 0.0, np.nan)]))
+    assert sorted(bucket for _, bucket in aggregator._tiles) == [int(T0 // HOUR) + 2, int(T0 // HOUR) + 3]
+    # Late samples for an evicted bucket are dropped, not rebuilt from scratch
+    aggregator.add_samples(1, _samples(T0, [(0.0, 0.0, np.nan)]))
+    assert aggregator.dropped == 1
+    assert (1, int(T0 // HOUR)) not in aggregator._tiles
+
+
+def test_density_colour_scale_is_fixed_per_level():
+    sparse = np.zeros((4, 4), dtype=np.float32)
+    sparse[0, 0] = 1
+    busy = sparse.copy()
+    busy[3, 3] = 50
+    # The shared cell renders identically whatever else is in the tile
+    a = heatmaps._colorize(sparse, 'density', density_scale=0.5)
+    b = heatmaps._colorize(busy, 'density', density_scale=0.5)
+    assert (a[0, 0] == b[0, 0]).all()
+    assert a[1, 1, 3] == 0
+
+
+def test_publish_writes_tiles_and_etags(aggregator, memory_cache):
+    aggregator.add_samples(7, _samples(T0, [(1.0, 1.0, 50.0)]))
+    published = aggregator.publish()
+    assert published == aggregator.max_level + 1
+    assert aggregator.publish() == 0
+
+    tile, _, _ = _finest(aggregator, 7, T0, 1.0, 1.0)
+    key = next(key for key, value in aggregator._tiles[(7, int(T0 // HOUR))].items() if value is tile)
+    etag, body = heatmaps.cached_tile(7, int(T0 // HOUR), 'risk', *key, 'json')
+    assert heatmaps.cached_tile_etag(7, int(T0 // HOUR), 'risk', *key, 'json') == etag
+    assert json.loads(body)['cells'][0][2:] == [50.0, 50.0]
+    assert heatmaps.cached_tile(7, int(T0 // HOUR), 'density', *key, 'png')[1].startswith(b'\x89PNG')
+
+
+def test_aggregator_survives_pickling(aggregator):
+    aggregator.add_samples(1, _samples(T0, [(1.0, 1.0, 10.0)]))
+    restored = pickle.loads(pickle.dumps(aggregator))
+    restored.add_samples(1, _samples(T0, [(1.0, 1.0, 30.0)]))
+    tile, row, col = _finest(restored, 1, T0, 1.0, 1.0)
+    assert tile.layer('risk')[row, col] == pytest.approx(20.0)
+
+
+def test_encode_tile_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        encode_tile(np.zeros((2, 2)), 'density', 'gif')
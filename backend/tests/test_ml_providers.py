@@ -0,0 +1,77 @@
+import pytest
+
+from apps.ml import jobs, providers
+
+
+class FakeDetector:
+    loads = 0
+
+    def __init__(self, threshold=0.5):
+        self.threshold = threshold
+
+    def load(self):
+        FakeDetector.loads += 1
+
+    def detect(self, image, prompts):
+        return [{'object_class': prompt, 'size': list(image.size)} for prompt in prompts]
+
+
+@pytest.fixture
+def ml_settings(settings, monkeypatch, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.ML_PROVIDERS = {
+        'detector': {'CLASS': f'{__name__}.FakeDetector', 'OPTIONS': {'threshold': 0.3}},
+    }
+    settings.PROCESS_ROLES = {
+        'api': {'PROVIDERS': [], 'PRELOAD': []},
+        'inference': {'PROVIDERS': ['detector'], 'PRELOAD': ['detector']},
+    }
+    monkeypatch.setattr(providers, '_registry', {})
+    FakeDetector.loads = 0
+    return settings
+
+
+def test_api_role_cannot_load_providers(ml_settings):
+    ml_settings.PROCESS_ROLE = 'api'
+    with pytest.raises(providers.ProviderUnavailable):
+        providers.get_provider('detector')
+    assert providers.warm_up() == []
+    assert FakeDetector.loads == 0
+
+
+def test_inference_role_loads_once(ml_settings):
+    ml_settings.PROCESS_ROLE = 'inference'
+    assert providers.warm_up() == ['detector']
+    detector = providers.get_provider('detector')
+    assert providers.get_provider('detector') is detector
+    assert detector.threshold == 0.3
+    assert FakeDetector.loads == 1
+
+
+def test_unknown_role_is_rejected(ml_settings):
+    from django.core.exceptions import ImproperlyConfigured
+
+    ml_settings.PROCESS_ROLE = 'gpu'
+    with pytest.raises(ImproperlyConfigured):
+        providers.get_provider('detector')
+
+
+def test_detect_job_runs_on_media_image(ml_settings, tmp_path):
+    from PIL import Image
+
+    ml_settings.PROCESS_ROLE = 'inference'
+    Image.new('RGB', (32, 16)).save(tmp_path / 'frame.jpg')
+    job = {'id': 'j1', 'type': 'detect', 'params': {'image': 'frame.jpg', 'prompts': ['hard hat']}}
+    assert jobs.run(job) == [{'object_class': 'hard hat', 'size': [32, 16]}]
+
+
+def test_detect_job_refuses_paths_outside_media(ml_settings):
+    ml_settings.PROCESS_ROLE = 'inference'
+    job = {'id': 'j2', 'type': 'detect', 'params': {'image': '../../etc/passwd', 'prompts': []}}
+    with pytest.raises(ValueError):
+        jobs.run(job)
+
+
+def test_submit_rejects_unknown_job_type():
+    with pytest.raises(ValueError):
+        jobs.submit('segment')
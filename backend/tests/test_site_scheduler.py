@@ -0,0 +1,113 @@
+import os
+import signal
+import time
+
+import pytest
+
+from apps.monitoring.scheduling import HashRing, SiteScheduler
+
+
+def new_site_state(site_id):
+    return {'count': 0, 'last_seq': 0, 'gaps': 0}
+
+
+def count_event(site_id, state, payload):
+    if payload['seq'] != state['last_seq'] + 1:
+        state['gaps'] += 1
+    state['last_seq'] = payload['seq']
+    state['count'] += 1
+
+
+def slow_check(site_id, state, payload):
+    time.sleep(payload or 0.0)
+    state['count'] += 1
+
+
+HANDLERS = {'count': f'{__name__}.count_event', 'slow': f'{__name__}.slow_check'}
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = SiteScheduler(HANDLERS, state_factory=f'{__name__}.new_site_state',
+                              replicas=32, handoff_timeout=10.0)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def _send(scheduler, site_ids, start, stop):
+    for seq in range(start, stop):
+        for site_id in site_ids:
+            scheduler.submit(site_id, 'count', {'seq': seq})
+
+
+def test_hash_ring_moves_few_sites_when_a_node_joins():
+    ring = HashRing(['a', 'b', 'c'], replicas=64)
+    before = {site_id: ring.owner(site_id) for site_id in range(1000)}
+    ring.add('d')
+    moved = [site_id for site_id in before if ring.owner(site_id) != before[site_id]]
+    assert all(ring.owner(site_id) == 'd' for site_id in moved)
+    assert 150 < len(moved) < 350
+    ring.remove('d')
+    assert {site_id: ring.owner(site_id) for site_id in range(1000)} == before
+
+
+def test_state_survives_worker_joins_and_leaves(scheduler):
+    sites = list(range(40))
+    scheduler.add_worker('w0')
+    scheduler.add_worker('w1')
+    _send(scheduler, sites, 1, 6)
+    scheduler.add_worker('w2')
+    _send(scheduler, sites, 6, 11)
+    scheduler.remove_worker('w0')
+    _send(scheduler, sites, 11, 16)
+    assert scheduler.wait_idle(timeout=20)
+
+    states = scheduler.shutdown()
+    assert set(states) == set(sites)
+    assert all(state == {'count': 15, 'last_seq': 15, 'gaps': 0} for state in states.values())
+
+
+def test_dead_worker_tasks_are_resubmitted(scheduler):
+    sites = list(range(20))
+    scheduler.add_worker('w0')
+    scheduler.add_worker('w1')
+    _send(scheduler, sites, 1, 3)
+    assert scheduler.wait_idle(timeout=20)
+
+    victim = scheduler.ring.owner(sites[0])
+    os.kill(scheduler._workers[victim][0].pid, signal.SIGKILL)
+    scheduler._workers[victim][0].join(5)
+    _send(scheduler, sites, 3, 5)
+    assert scheduler.reap_dead_workers() == [victim]
+    assert scheduler.wait_idle(timeout=20)
+
+    states = scheduler.shutdown()
+    for site_id in sites:
+        # Sites of the killed worker restart from fresh state but get every later event
+        assert states[site_id]['last_seq'] == 4
+    assert scheduler.ring.nodes == set()
+
+
+def test_periodic_tasks_skip_sites_with_unfinished_runs(scheduler):
+    scheduler.add_worker('w0')
+    sites = [1, 2, 3]
+    first = scheduler.schedule_periodic(sites, 'slow', 0.3)
+    assert set(first) == set(sites)
+    # Still running or queued: nothing new is submitted
+    assert scheduler.schedule_periodic(sites, 'slow', 0.3) == {}
+    # Other task names are not held back
+    assert set(scheduler.schedule_periodic(sites, 'count', {'seq': 1})) == set(sites)
+    assert scheduler.wait_idle(timeout=10)
+    assert set(scheduler.schedule_periodic(sites, 'slow', 0.0)) == set(sites)
+    assert scheduler.wait_idle(timeout=10)
+    assert all(state['count'] == 3 for state in scheduler.shutdown().values())
+
+
+def test_lag_reports_pending_tasks(scheduler):
+    scheduler.add_worker('w0')
+    scheduler.schedule_periodic([7], 'slow', 0.5)
+    time.sleep(0.2)
+    lag = scheduler.lag()
+    assert lag[7]['pending'] == 1 and lag[7]['lag_seconds'] > 0.1
+    assert scheduler.wait_idle(timeout=10)
+    assert scheduler.lag()[7] == {'owner': 'w0', 'pending': 0, 'lag_seconds': 0.0}
@@ -0,0 +1,159 @@
+import struct
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from apps.detection import wire
+
+
+def _detection(**overrides):
+    detection = {
+        'timestamp': 1_700_000_000.25,
+        'camera_id': 1,
+        'worker_id': None,
+        'zone_id': None,
+        'detection_type': 'ppe',
+        'object_class': 'hard_hat',
+        'confidence': 0.75,
+        'bounding_box': {'x': 10.0, 'y': 20.0, 'width': 30.0, 'height': 40.0},
+        'worker_position': {'x': 1.5, 'y': -2.5},
+    }
+    detection.update(overrides)
+    return detection
+
+
+def _patch_record(payload, field, value):
+    """Rewrite one field of the first record in an uncompressed batch"""
+    data = bytearray(payload)
+    header = wire.HEADER.unpack_from(data)
+    body = data[wire.HEADER.size:]
+    offset = 0
+    for _ in range(header[3]):
+        offset += 1 + body[offset]
+    records = np.frombuffer(bytes(body[offset:]), dtype=wire.RECORD_DTYPE).copy()
+    records[0][field] = value
+    return bytes(data[:wire.HEADER.size]) + bytes(body[:offset]) + records.tobytes()
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_round_trip(compress):
+    detections = [_detection(), _detection(object_class='vest', worker_id=7, zone_id=3, worker_position=None)]
+    batch = wire.decode(wire.encode(detections, compress=compress))
+    assert len(batch) == 2
+    rows = list(batch.iter_dicts())
+    assert rows[0] == detections[0]
+    assert rows[1]['worker_id'] == 7 and rows[1]['zone_id'] == 3 and rows[1]['worker_position'] is None
+    assert batch.class_names().tolist() == ['hard_hat', 'vest']
+
+
+def test_uncompressed_records_are_a_view():
+    payload = wire.encode([_detection()])
+    batch = wire.decode(payload)
+    assert not batch.records.flags.owndata and not batch.records.flags.writeable
+
+
+def test_empty_batch():
+    for compress in (False, True):
+        assert len(wire.decode(wire.encode([], compress=compress))) == 0
+
+
+@pytest.mark.parametrize('payload, message', [
+    (b'SED', 'Truncated header'),
+    (b'JSON' + bytes(8), 'Not a detection batch'),
+    (wire.HEADER.pack(wire.MAGIC, 9, 0, 0, 0), 'Unsupported wire format version'),
+    (wire.HEADER.pack(wire.MAGIC, wire.VERSION, 0, 2, 0) + b'\x01a', 'Truncated string table'),
+    (wire.HEADER.pack(wire.MAGIC, wire.VERSION, 0, 1, 1) + b'\x01a' + bytes(10), 'Record section length'),
+    (wire.HEADER.pack(wire.MAGIC, wire.VERSION, 0, 1, 0) + b'\x02\xff\xfe', 'not valid UTF-8'),
+    (wire.HEADER.pack(wire.MAGIC, wire.VERSION, 0, 1, 0) + b'\x65' + b'a' * 101, 'longer than 100'),
+])
+def test_malformed_batches(payload, message):
+    with pytest.raises(wire.WireFormatError, match=message):
+        wire.decode(payload)
+
+
+def test_truncated_record_section():
+    payload = wire.encode([_detection(), _detection()])
+    with pytest.raises(wire.WireFormatError, match='Record section length'):
+        wire.decode(payload[:-1])
+
+
+def test_corrupt_and_truncated_compressed_bodies():
+    payload = wire.encode([_detection()] * 5, compress=True)
+    with pytest.raises(wire.WireFormatError, match='Truncated compressed body'):
+        wire.decode(payload[:-4])
+    corrupt = payload[:wire.HEADER.size] + b'\x00' * (len(payload) - wire.HEADER.size)
+    with pytest.raises(wire.WireFormatError, match='Corrupt compressed body'):
+        wire.decode(corrupt)
+
+
+def test_decompression_is_bounded_by_header():
+    bomb = wire.HEADER.pack(wire.MAGIC, wire.VERSION, wire.FLAG_ZLIB, 1, 1) + zlib.compress(bytes(50_000_000))
+    with pytest.raises(wire.WireFormatError, match='larger than the header allows'):
+        wire.decode(bomb)
+
+
+@pytest.mark.parametrize('field, value, message', [
+    ('timestamp', np.nan, 'Timestamp'),
+    ('timestamp', np.inf, 'Timestamp'),
+    ('timestamp', -1.0, 'Timestamp'),
+    ('timestamp', 1e300, 'Timestamp'),
+    ('confidence', np.nan, 'not finite'),
+    ('bbox', (0.0, np.inf, 1.0, 1.0), 'not finite'),
+    ('position', (np.inf, 0.0), 'infinite'),
+    ('object_class', 5, 'Object class index'),
+    ('detection_type', 200, 'Detection type index'),
+])
+def test_out_of_range_values(field, value, message):
+    payload = _patch_record(wire.encode([_detection()]), field, value)
+    with pytest.raises(wire.WireFormatError, match=message):
+        wire.decode(payload)
+
+
+def test_encoder_rejects_long_class_names():
+    with pytest.raises(wire.WireFormatError):
+        wire.encode([_detection(object_class='x' * 101)])
+
+
+def test_wire_types_match_model_choices():
+    from apps.detection.models import Detection
+
+    assert wire.DETECTION_TYPES == tuple(value for value, _ in Detection.DETECTION_TYPES)
+    assert wire.MAX_CLASS_LENGTH == Detection._meta.get_field('object_class').max_length
+
+
+@pytest.fixture
+def camera(site):
+    from django.contrib.gis.geos import Point
+    from apps.monitoring.models import Camera
+
+    return Camera.objects.create(site=site, name='Gate', position=Point(0.0, 0.0),
+                                 stream_url='rtsp://camera.local/gate')
+
+
+@pytest.mark.django_db
+def test_bulk_ingest_keeps_capture_time(camera):
+    payload = wire.encode([_detection(camera_id=camera.pk), _detection(camera_id=camera.pk, timestamp=1_700_000_060.0)])
+
+    created = wire.bulk_ingest(payload)
+
+    from apps.detection.models import Detection
+    stored = sorted(Detection.objects.values_list('timestamp', flat=True))
+    assert stored == [
+        datetime.fromtimestamp(1_700_000_000.25, tz=timezone.utc),
+        datetime.fromtimestamp(1_700_000_060.0, tz=timezone.utc),
+    ]
+    assert created[0].timestamp == stored[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('field', ['camera_id', 'worker_id', 'zone_id'])
+def test_bulk_ingest_rejects_unknown_references(camera, field):
+    from apps.detection.models import Detection
+
+    detection = _detection(camera_id=camera.pk)
+    detection[field] = 987654
+    with pytest.raises(wire.WireFormatError, match=field):
+        wire.bulk_ingest(wire.encode([detection]))
+    assert not Detection.objects.exists()